@@ -1,11 +1,20 @@
-import time, math, random, json, os
+import math, json, os, tempfile
+
+from bench_core import Benchmark, main
+from bench_fixtures import fixture, random_ints
+
+class AlgorithmicMixTestTest(Benchmark):
+    # staged input copies per prepare(): 256 lists of `size` pointers
+    prepare_batch = 256
 
-class AlgorithmicMixTestTest:
     def __init__(self, size=5000, depth=8, runs=5):
+        super().__init__(runs=runs)
         self.name = "Algorithmic Mix"
         self.size = size
         self.depth = depth
-        self.runs = runs
+
+    def params(self):
+        return {"size": self.size}
 
     def _recursive_fib(self, n):
         if n < 2:
@@ -18,45 +27,31 @@ class AlgorithmicMixTestTest:
         return arr.index(target)
 
     def _io_cycle(self, data):
-        fname = "temp_mix_test.tmp"
-        with open(fname, "w") as f:
+        with open(self.path, "w") as f:
             json.dump(data, f)
-        with open(fname, "r") as f:
-            return json.load(f)
-        os.remove(fname)
+        with open(self.path, "r") as f:
+            loaded = json.load(f)
+        return loaded
+
+    def setup(self):
+        self.numbers = fixture("random_ints", random_ints, self.size, 1, 100000)
+        # a private file per run: concurrent runs must not share (or delete) each other's
+        fd, self.path = tempfile.mkstemp(prefix="mix_", suffix=".json")
+        os.close(fd)
+
+    def teardown(self):
+        os.remove(self.path)
 
-    def run_once(self):
-        numbers = [random.randint(1, 100000) for _ in range(min(self.size, 5000))]  # ✅ Cap to safe size
+    def prepare(self, reps):
+        # the sort works in place, so every rep gets its own unsorted copy
+        self.pending = [list(self.numbers) for _ in range(reps)]
 
-        t0 = time.perf_counter()
+    def workload(self):
+        numbers = self.pending.pop()
         math_sum = sum(math.sin(i) * math.sqrt(i % 100 + 1) for i in range(1, 500))
         fib_val = self._recursive_fib(10)
         idx = self._sort_and_search(numbers)
-        _ = self._io_cycle({"sum": math_sum, "fib": fib_val, "idx": idx, "nums": numbers[:50]})
-        t1 = time.perf_counter()
-
-        duration = t1 - t0
-        return {"duration_s": duration, "ops_per_s": 1 / duration if duration > 0 else 0}
-
-    def run(self, runs=None, iterations=None):
-        if runs is not None:
-            self.runs = runs
-        if iterations is not None:
-            self.size = min(iterations, 5000)  # ✅ Avoid huge freeze
-
-        results = [self.run_once() for _ in range(self.runs)]
-        times = sorted(r["duration_s"] for r in results)
-        ops = sorted(r["ops_per_s"] for r in results)
-        return {
-            "name": self.name,
-            "runs": self.runs,
-            "median_time_s": times[len(times)//2],
-            "median_ops_per_s": ops[len(ops)//2],
-            "raw": results
-        }
+        return self._io_cycle({"sum": math_sum, "fib": fib_val, "idx": idx, "nums": numbers[:50]})
 
 if __name__ == "__main__":
-    result = AlgorithmicMixTestTest().run()
-    with open("results_algorithmic_mix_python.json", "w") as f:
-        json.dump(result, f, indent=2)
-    print(json.dumps(result, indent=2))
+    main(AlgorithmicMixTestTest, __file__)
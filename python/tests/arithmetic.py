@@ -1,13 +1,81 @@
-import time
-import tracemalloc
 import math
-import gc
+from array import array
+from decimal import Decimal
+from fractions import Fraction
+from operator import mul
 
-class ArithmeticTest:
+from bench_core import Benchmark, Skip, main, traced_peak
+from bench_fixtures import fixture
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SIZES = (10_000, 1_000_000)
+# sin(x) * sqrt(x) summed over x = 1..n
+BATCHED = ("loop", "map", "array", "numpy_out", "numpy_temporaries")
+SUMS = ("sum", "fsum", "numpy_sum")
+DTYPES = ("int_small", "bigint", "float", "decimal", "fraction", "complex")
+NEEDS_NUMPY = {"numpy_out", "numpy_temporaries", "numpy_sum"}
+
+
+def mixed_magnitudes(rng, n):
+    # alternating signs over 16 decades: naive float summation loses digits here
+    return [rng.uniform(-1, 1) * 10.0 ** rng.randint(-8, 8) for _ in range(n)]
+
+
+def typed_values(rng, dtype, n):
+    ks = [rng.randrange(1, 1000) for _ in range(n)]
+    if dtype == "int_small":
+        return ks
+    if dtype == "bigint":
+        return [k << 200 for k in ks]
+    if dtype == "float":
+        return [k / 8 for k in ks]
+    if dtype == "decimal":
+        return [Decimal(k) / 8 for k in ks]
+    if dtype == "fraction":
+        # a fixed denominator keeps the running sum's size bounded
+        return [Fraction(k, 8) for k in ks]
+    if dtype == "complex":
+        return [complex(k, -k) / 8 for k in ks]
+    raise ValueError(f"unknown dtype {dtype!r}")
+
+
+class ArithmeticTest(Benchmark):
     name = "Arithmetic"
 
-    def __init__(self, ops_per_iter=10_000_000):
-        self.ops_per_iter = ops_per_iter
+    def __init__(self, ops_per_iter=None, impl="scalar", n=1_000_000, dtype="float", sizes=SIZES,
+                 type_n=100_000, seed=0):
+        super().__init__(ops_per_iter)
+        self.impl = impl
+        self.n = n
+        self.dtype = dtype
+        self.sizes = sizes
+        self.type_n = type_n
+        self.seed = seed
+
+    @property
+    def ops_per_call(self):
+        if self.impl == "scalar":
+            return 100
+        if self.impl == "types":
+            return self.type_n
+        return self.n
+
+    def params(self):
+        if self.impl == "scalar":
+            return {"impl": "scalar", "n": 100}
+        if self.impl == "types":
+            return {"impl": "types", "dtype": self.dtype, "n": self.type_n}
+        return {"impl": self.impl, "n": self.n}
+
+    def variants(self):
+        out = [{"impl": i, "n": n} for i in BATCHED for n in self.sizes]
+        out += [{"impl": s, "n": max(self.sizes)} for s in SUMS]
+        out += [{"impl": "types", "dtype": t} for t in DTYPES]
+        return out
 
     def _workload(self, size=100):
         s_int = 0
@@ -17,50 +85,97 @@ class ArithmeticTest:
             s_float += math.sin(i) * math.sqrt(i)
         return s_int, s_float
 
-    def run_once(self, iterations):
-        gc.collect()
-        tracemalloc.start()
-        t0 = time.perf_counter()
-
-        reps = max(1, iterations // 100)
-        acc_int = 0
-        acc_float = 0.0
-        for _ in range(reps):
-            i, f = self._workload(100)
-            acc_int += i
-            acc_float += f
-
-        t1 = time.perf_counter()
-        current, peak = tracemalloc.get_traced_memory()
-        tracemalloc.stop()
-
-        duration = t1 - t0
-        ops_done = reps * 100
-        return {
-            "time_s": duration,
-            "ops": ops_done,
-            "ops_per_sec": ops_done / duration if duration > 0 else float("inf"),
-            "mem_current_bytes": current,
-            "mem_peak_bytes": peak,
-            "acc_int": acc_int,
-            "acc_float": acc_float
-        }
+    def setup(self):
+        impl = self.impl
+        if impl in NEEDS_NUMPY and numpy is None:
+            raise Skip("numpy is not installed")
+        if impl in BATCHED:
+            self.xs = [float(i) for i in range(1, self.n + 1)]
+            if impl == "array":
+                self.xs = array("d", self.xs)
+            elif impl.startswith("numpy"):
+                self.xs = numpy.array(self.xs)
+                self.a = numpy.empty_like(self.xs)
+                self.b = numpy.empty_like(self.xs)
+        elif impl in SUMS:
+            self.values = fixture("mixed_magnitudes", mixed_magnitudes, self.n, seed=self.seed)
+            exact = math.fsum(self.values)
+            if impl == "numpy_sum":
+                self.values = numpy.array(self.values)
+            self.abs_error = abs(float(self.workload()) - exact)
+        elif impl == "types":
+            self.xs = fixture("typed_values", typed_values, self.dtype, self.type_n, seed=self.seed)
+            self.ys = fixture("typed_values", typed_values, self.dtype, self.type_n, seed=self.seed + 1)
+        # memory is traced in one untimed call; tracing inside the samples would skew them
+        self.peak_bytes_per_element = traced_peak(self.workload) / self.ops_per_call
 
-    def run(self, runs=5, iterations=None):
-        if iterations is None:
-            iterations = self.ops_per_iter
-        results = [self.run_once(iterations) for _ in range(runs)]
-
-        times = sorted(r["time_s"] for r in results)
-        ops_per_sec = sorted(r["ops_per_sec"] for r in results)
-        peaks = sorted(r["mem_peak_bytes"] for r in results)
-        mid = len(results) // 2
-
-        return {
-            "name": self.name,
-            "runs": runs,
-            "median_time_sec": times[mid],
-            "median_ops_per_sec": ops_per_sec[mid],
-            "median_peak_mem_bytes": peaks[mid],
-            "raw": results
+    def teardown(self):
+        self.xs = self.ys = self.values = self.a = self.b = None
+
+    def workload(self):
+        impl = self.impl
+        if impl == "scalar":
+            return self._workload(self.ops_per_call)
+        if impl == "loop":
+            s, sin, sqrt = 0.0, math.sin, math.sqrt
+            for x in self.xs:
+                s += sin(x) * sqrt(x)
+            return s
+        if impl == "map":
+            xs = self.xs
+            return sum(map(mul, map(math.sin, xs), map(math.sqrt, xs)))
+        if impl == "array":
+            # products materialized in a typed buffer instead of streamed into sum()
+            xs = self.xs
+            return sum(array("d", map(mul, map(math.sin, xs), map(math.sqrt, xs))))
+        if impl == "numpy_out":
+            # preallocated buffers: no temporaries per call
+            a, b = self.a, self.b
+            numpy.sin(self.xs, out=a)
+            numpy.sqrt(self.xs, out=b)
+            numpy.multiply(a, b, out=a)
+            return float(a.sum())
+        if impl == "numpy_temporaries":
+            return float((numpy.sin(self.xs) * numpy.sqrt(self.xs)).sum())
+        if impl == "sum":
+            return sum(self.values)
+        if impl == "fsum":
+            return math.fsum(self.values)
+        if impl == "numpy_sum":
+            # pairwise summation
+            return self.values.sum()
+        if impl == "types":
+            acc = self.xs[0] * 0
+            for x, y in zip(self.xs, self.ys):
+                acc += x * y
+            return acc
+        raise ValueError(f"unknown impl {impl!r}")
+
+    def sample_metrics(self, reps, elapsed):
+        metrics = {
+            "elements_per_sec": self.ops_per_call * reps / elapsed if elapsed > 0 else 0,
+            "peak_bytes_per_element": self.peak_bytes_per_element,
         }
+        if self.impl in SUMS:
+            metrics["abs_error_vs_exact"] = self.abs_error
+        return metrics
+
+    def compare_variants(self, primary, variant_results):
+        batched, sums, types = {}, {}, {}
+        for r in variant_results:
+            v = r["variant"]
+            row = {
+                "elements_per_sec": r["median_elements_per_sec"],
+                "peak_bytes_per_element": r["median_peak_bytes_per_element"],
+            }
+            if v["impl"] == "types":
+                types[v["dtype"]] = row
+            elif v["impl"] in SUMS:
+                row["abs_error_vs_exact"] = r["median_abs_error_vs_exact"]
+                sums[v["impl"]] = row
+            else:
+                batched.setdefault(v["impl"], {})[v["n"]] = row
+        return {"batched": batched, "summation": sums, "numeric_types": types}
+
+if __name__ == "__main__":
+    main(ArithmeticTest, __file__)
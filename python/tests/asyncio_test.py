@@ -0,0 +1,164 @@
+import asyncio
+import time
+
+from bench_core import Benchmark, Skip, main, percentile
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+SCENARIOS = ("spawn", "queue", "gather", "tcp_echo")
+LOOPS = ("asyncio", "uvloop") if uvloop else ("asyncio",)
+
+
+async def _noop():
+    pass
+
+
+async def _yield_once():
+    await asyncio.sleep(0)
+
+
+async def _echo_handler(reader, writer):
+    try:
+        while True:
+            data = await reader.read(4096)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    finally:
+        writer.close()
+
+
+class AsyncioTestTest(Benchmark):
+    name = "Asyncio / Event Loop"
+    default_runs = 3
+
+    def __init__(self, scenario="spawn", loop_impl="asyncio", tasks=1000, messages=10_000,
+                 consumers=4, fanout=100, connections=100, messages_per_conn=10,
+                 message_size=64, scenarios=SCENARIOS, loops=LOOPS):
+        super().__init__()
+        self.scenario = scenario
+        self.loop_impl = loop_impl
+        self.tasks = tasks
+        self.messages = messages
+        self.consumers = consumers
+        self.fanout = fanout
+        self.connections = connections
+        self.messages_per_conn = messages_per_conn
+        self.message_size = message_size
+        self.scenarios = scenarios
+        self.loops = loops
+
+    @property
+    def ops_per_call(self):
+        return {
+            "spawn": self.tasks,
+            "queue": self.messages,
+            "gather": self.fanout,
+            "tcp_echo": self.connections * self.messages_per_conn,
+        }[self.scenario]
+
+    def params(self):
+        p = {"scenario": self.scenario, "loop": self.loop_impl}
+        if self.scenario == "spawn":
+            p["tasks"] = self.tasks
+        elif self.scenario == "queue":
+            p.update(messages=self.messages, consumers=self.consumers)
+        elif self.scenario == "gather":
+            p["fanout"] = self.fanout
+        else:
+            p.update(connections=self.connections, messages_per_conn=self.messages_per_conn,
+                     message_size=self.message_size)
+        return p
+
+    def variants(self):
+        return [{"scenario": s, "loop_impl": l} for l in self.loops for s in self.scenarios
+                if (s, l) != (self.scenario, self.loop_impl)]
+
+    def setup(self):
+        if self.loop_impl == "uvloop":
+            if uvloop is None:
+                raise Skip("uvloop is not installed")
+            self.loop = uvloop.new_event_loop()
+        else:
+            self.loop = asyncio.new_event_loop()
+        self.server = None
+        if self.scenario == "tcp_echo":
+            self.server = self.loop.run_until_complete(
+                asyncio.start_server(_echo_handler, "127.0.0.1", 0))
+            self.port = self.server.sockets[0].getsockname()[1]
+            self.payload = b"x" * self.message_size
+
+    def teardown(self):
+        if self.server is not None:
+            self.server.close()
+            self.loop.run_until_complete(self.server.wait_closed())
+        self.loop.close()
+
+    async def spawn(self):
+        tasks = [asyncio.create_task(_noop()) for _ in range(self.tasks)]
+        for t in tasks:
+            await t
+
+    async def queue(self):
+        q = asyncio.Queue(maxsize=100)
+        received = 0
+
+        async def consumer():
+            nonlocal received
+            while True:
+                item = await q.get()
+                if item is None:
+                    return
+                received += 1
+
+        workers = [asyncio.create_task(consumer()) for _ in range(self.consumers)]
+        for i in range(self.messages):
+            await q.put(i)
+        for _ in workers:
+            await q.put(None)
+        await asyncio.gather(*workers)
+        return received
+
+    async def gather(self):
+        t0 = time.perf_counter()
+        await asyncio.gather(*(_yield_once() for _ in range(self.fanout)))
+        self.counters.setdefault("latencies", []).append(time.perf_counter() - t0)
+
+    async def tcp_echo(self):
+        async def client():
+            reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+            for _ in range(self.messages_per_conn):
+                writer.write(self.payload)
+                await writer.drain()
+                await reader.readexactly(len(self.payload))
+            writer.close()
+            await writer.wait_closed()
+
+        await asyncio.gather(*(client() for _ in range(self.connections)))
+
+    def workload(self):
+        return self.loop.run_until_complete(getattr(self, self.scenario)())
+
+    def sample_metrics(self, reps, elapsed):
+        latencies = sorted(self.counters.get("latencies", ()))
+        if not latencies:
+            return {}
+        return {
+            "gather_p50_s": percentile(latencies, 50),
+            "gather_p90_s": percentile(latencies, 90),
+            "gather_p99_s": percentile(latencies, 99),
+        }
+
+    def compare_variants(self, primary, variant_results):
+        table = {self.scenario: {self.loop_impl: primary["median_ops_per_sec"]}}
+        for r in variant_results:
+            v = r["variant"]
+            table.setdefault(v["scenario"], {})[v["loop_impl"]] = r["median_ops_per_sec"]
+        return {"ops_per_sec_by_scenario": table}
+
+if __name__ == "__main__":
+    main(AsyncioTestTest, __file__)
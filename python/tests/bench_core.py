@@ -0,0 +1,457 @@
+"""Shared timing and statistics engine for the python benchmarks.
+
+A test subclasses Benchmark and implements workload() (plus setup() for
+anything that must stay out of the timed region). run() owns warmup, the
+timed loop and the statistics, so every test reports the same result schema
+and runner.c can always find "median_ops_per_sec".
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+import traceback
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def percentile(sorted_vals, q):
+    """Linear-interpolated percentile (q in 0..100) of an already sorted list."""
+    if not sorted_vals:
+        return float("nan")
+    pos = (len(sorted_vals) - 1) * q / 100.0
+    lo = math.floor(pos)
+    hi = math.ceil(pos)
+    if lo == hi:
+        return sorted_vals[lo]
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (pos - lo)
+
+
+def median_abs_deviation(vals):
+    if not vals:
+        return float("nan")
+    med = statistics.median(vals)
+    return statistics.median(abs(v - med) for v in vals)
+
+
+def bootstrap_ci(vals, stat=statistics.median, level=0.95, resamples=1000, seed=0):
+    """Percentile bootstrap confidence interval; seeded so reruns agree."""
+    if len(vals) < 2:
+        v = stat(vals) if vals else float("nan")
+        return [v, v]
+    rng = random.Random(seed)
+    n = len(vals)
+    estimates = sorted(stat([vals[rng.randrange(n)] for _ in range(n)]) for _ in range(resamples))
+    tail = (1.0 - level) / 2 * 100
+    return [percentile(estimates, tail), percentile(estimates, 100 - tail)]
+
+
+def summarize_times(times):
+    ordered = sorted(times)
+    return {
+        "median_time_s": statistics.median(ordered),
+        "mean_time_s": statistics.fmean(ordered),
+        "stddev_time_s": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        "mad_time_s": median_abs_deviation(ordered),
+        "min_time_s": ordered[0],
+        "max_time_s": ordered[-1],
+        "p50_time_s": percentile(ordered, 50),
+        "p90_time_s": percentile(ordered, 90),
+        "p99_time_s": percentile(ordered, 99),
+        "ci95_median_time_s": bootstrap_ci(ordered),
+    }
+
+
+def traced_peak(fn):
+    """Peak traced allocation of one fn() call. Run it outside the timed loop:
+    tracemalloc slows allocation-heavy code several-fold."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def traced_size(fn):
+    """Traced bytes still held once fn() returns, i.e. the footprint of what it built."""
+    tracemalloc.start()
+    try:
+        kept = fn()
+        size = tracemalloc.get_traced_memory()[0]
+        del kept
+        return size
+    finally:
+        tracemalloc.stop()
+
+
+def max_rss_bytes():
+    """Process high-water RSS, or None where resource is unavailable."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def current_rss_bytes():
+    """Resident set size right now, from /proc (Linux); None elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def reset_peak_rss():
+    """Restart the kernel's per-process RSS high-water mark (Linux 4.0+); False where unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_since_reset():
+    """VmHWM in bytes: the RSS high-water mark since the last reset_peak_rss()."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class GcPauses:
+    """Context manager timing every collection through gc.callbacks."""
+
+    def __init__(self):
+        self.pauses = []
+        self._start = None
+
+    def _callback(self, phase, info):
+        if phase == "start":
+            self._start = time.perf_counter()
+        elif self._start is not None:
+            self.pauses.append(time.perf_counter() - self._start)
+            self._start = None
+
+    def __enter__(self):
+        self.collections = [g["collections"] for g in gc.get_stats()]
+        gc.callbacks.append(self._callback)
+        return self
+
+    def __exit__(self, *exc):
+        gc.callbacks.remove(self._callback)
+        after = [g["collections"] for g in gc.get_stats()]
+        self.collections = [b - a for a, b in zip(self.collections, after)]
+        return False
+
+
+def default_worker_counts():
+    """1, 2, 4, ... up to and including the cores this process may run on, for scaling sweeps."""
+    if hasattr(os, "sched_getaffinity"):
+        n = len(os.sched_getaffinity(0))
+    else:
+        n = os.cpu_count() or 1
+    counts = []
+    w = 1
+    while w < n:
+        counts.append(w)
+        w *= 2
+    counts.append(n)
+    return counts
+
+
+class Skip(Exception):
+    """Raised from setup() when a configuration cannot run on this platform."""
+
+
+def _rate(amount, seconds):
+    return amount / seconds if seconds > 0 else float("inf")
+
+
+class Benchmark:
+    name = None
+    # logical operations performed by one workload() call; override as a
+    # property when it depends on constructor arguments
+    ops_per_call = 1
+    default_runs = 5
+    warmup = 1
+    # without an explicit iterations count, reps per sample grow until one
+    # sample takes at least this long
+    target_time = 0.2
+    # spreads its own work over several cores; the suite scheduler runs it alone
+    exclusive = False
+    # follow the timed samples with one untimed instrumentation pass
+    instrumented = True
+    # most reps one prepare() call stages; larger samples are timed batch by batch
+    # so staged inputs never outgrow memory (None: the whole sample at once)
+    prepare_batch = None
+
+    def __init__(self, ops_per_iter=None, runs=None):
+        self.ops_per_iter = ops_per_iter
+        if runs is not None:
+            self.default_runs = runs
+        self.counters = {}
+
+    def setup(self):
+        pass
+
+    def teardown(self):
+        pass
+
+    def prepare(self, reps):
+        """Untimed hook before every batch of reps calls (the whole sample unless
+        prepare_batch caps it), e.g. to stage fresh copies of inputs the workload mutates."""
+
+    def workload(self):
+        raise NotImplementedError
+
+    def params(self):
+        """Parameters that identify this configuration in the result."""
+        return {}
+
+    def variants(self):
+        """Attribute overrides to sweep after the primary configuration, one dict each."""
+        return []
+
+    def compare_variants(self, primary, variant_results):
+        """Derived cross-variant numbers (speedups, crossovers, ...) merged into the result.
+        variant_results holds completed variants only: skipped and failed ones are filtered out."""
+        return {}
+
+    def sample_metrics(self, reps, elapsed):
+        """Extra per-sample numbers; defaults to whatever workload() put in self.counters."""
+        return dict(self.counters)
+
+    def reps_for(self, iterations):
+        return max(1, iterations // self.ops_per_call)
+
+    def calibrate(self, target_time):
+        """Autorange like timeit: try 1, 2, 5, 10, 20, 50, ... reps until a sample reaches target_time."""
+        scale = 1
+        while True:
+            for step in (1, 2, 5):
+                reps = scale * step
+                if self.time_reps(reps) >= target_time:
+                    return reps
+            scale *= 10
+
+    def time_reps(self, reps):
+        workload = self.workload
+        self.counters = {}
+        batch = self.prepare_batch or reps
+        elapsed = 0.0
+        while reps > 0:
+            n = min(batch, reps)
+            self.prepare(n)
+            gc.collect()
+            t0 = time.perf_counter()
+            for _ in range(n):
+                workload()
+            elapsed += time.perf_counter() - t0
+            reps -= n
+        return elapsed
+
+    def instrument(self, reps):
+        """Memory and GC figures from one extra pass of reps calls, kept apart
+        from the timed samples so the probes cannot skew them."""
+        getblocks = getattr(sys, "getallocatedblocks", None)
+        workload = self.workload
+        self.counters = {}
+        # one batch: staging more inside the pass would show up in its memory figures
+        reps = min(reps, self.prepare_batch or reps)
+        self.prepare(reps)
+        gc.collect()
+        blocks = getblocks() if getblocks else None
+        # ru_maxrss never comes down, so in a long-lived worker or a variant sweep it
+        # would report the largest configuration seen so far: measure this pass only
+        rss_before = current_rss_bytes()
+        peak_reset = reset_peak_rss()
+        with GcPauses() as gc_pauses:
+            for _ in range(reps):
+                workload()
+        rss_after = current_rss_bytes()
+        pauses = gc_pauses.pauses
+        return {
+            "reps": reps,
+            "rss_before_bytes": rss_before,
+            "rss_delta_bytes": rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+            "pass_peak_rss_bytes": peak_rss_since_reset() if peak_reset else None,
+            "allocated_blocks_delta": getblocks() - blocks if getblocks else None,
+            "gc_collections": gc_pauses.collections,
+            "gc_pause_count": len(pauses),
+            "gc_pause_total_s": sum(pauses),
+            "gc_pause_max_s": max(pauses, default=0.0),
+        }
+
+    def run_once(self, reps):
+        elapsed = self.time_reps(reps)
+        ops = reps * self.ops_per_call
+        sample = {
+            "time_s": elapsed,
+            "reps": reps,
+            "ops": ops,
+            "ops_per_sec": _rate(ops, elapsed),
+        }
+        sample.update(self.sample_metrics(reps, elapsed))
+        return sample
+
+    def run(self, runs=None, iterations=None, target_time=None, variants=True):
+        """Primary configuration, then (unless variants=False) the variant sweep.
+
+        iterations pins the primary configuration only: a variant may cost orders of
+        magnitude more per op, so every variant calibrates to target_time."""
+        runs = runs or self.default_runs
+        iterations = iterations or self.ops_per_iter
+        target_time = target_time or self.target_time
+
+        result = self.run_config(runs, iterations, target_time)
+        sweep = self.variants() if variants else []
+        if sweep:
+            variant_results = [self.run_variant(v, runs, None, target_time) for v in sweep]
+            completed = [r for r in variant_results if "skipped" not in r and "error" not in r]
+            try:
+                result.update(self.compare_variants(result, completed))
+            except Exception as e:
+                result["compare_error"] = f"{type(e).__name__}: {e}"
+            result["variants"] = variant_results
+        return result
+
+    def run_config(self, runs, iterations, target_time):
+        self.setup()
+        try:
+            for _ in range(self.warmup):
+                self.time_reps(1)
+
+            reps = self.reps_for(iterations) if iterations else self.calibrate(target_time)
+            samples = [self.run_once(reps) for _ in range(runs)]
+            instrumentation = self.instrument(reps) if self.instrumented else None
+        finally:
+            self.teardown()
+        result = self.summarize(samples, runs, iterations)
+        if instrumentation:
+            result["instrumentation"] = instrumentation
+        result["calibrated"] = not iterations
+        result["target_time_s"] = None if iterations else target_time
+        return result
+
+    def run_variant(self, variant, runs, iterations, target_time):
+        saved = {key: getattr(self, key) for key in variant}
+        try:
+            for key, value in variant.items():
+                setattr(self, key, value)
+            result = self.run_config(runs, iterations, target_time)
+        except Skip as e:
+            result = {"name": self.name, "skipped": str(e)}
+        except Exception as e:
+            # one broken configuration must not cost the primary result or the rest of the sweep
+            result = {"name": self.name, "error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc()}
+        finally:
+            for key, value in saved.items():
+                setattr(self, key, value)
+        result["variant"] = dict(variant)
+        return result
+
+    def summarize(self, samples, runs, iterations):
+        times = [s["time_s"] for s in samples]
+        ops_rates = [s["ops_per_sec"] for s in samples]
+        ops_per_sample = samples[0]["ops"]
+
+        result = {
+            "name": self.name,
+            "runs": runs,
+            "iterations": iterations,
+            "reps": samples[0]["reps"],
+            "ops_per_sample": ops_per_sample,
+            "params": self.params(),
+        }
+        result.update(summarize_times(times))
+        result["median_ops_per_sec"] = statistics.median(ops_rates)
+        result["median_ns_per_op"] = result["median_time_s"] / ops_per_sample * 1e9 if ops_per_sample else None
+        lo, hi = result["ci95_median_time_s"]
+        result["ci95_ops_per_sec"] = [_rate(ops_per_sample, hi), _rate(ops_per_sample, lo)]
+
+        base_keys = {"time_s", "reps", "ops", "ops_per_sec"}
+        extra_keys = [k for k in samples[0] if k not in base_keys]
+        for key in extra_keys:
+            vals = [s[key] for s in samples if isinstance(s.get(key), (int, float)) and not isinstance(s.get(key), bool)]
+            if len(vals) == len(samples):
+                result[f"median_{key}"] = statistics.median(vals)
+
+        result["raw"] = samples
+        return result
+
+
+def without_raw(result):
+    """Copy of a result without raw samples, for printing."""
+    summary = {k: v for k, v in result.items() if k not in ("raw", "variants")}
+    if "variants" in result:
+        summary["variants"] = [without_raw(v) for v in result["variants"]]
+    return summary
+
+
+def results_path(script_file, directory=None):
+    module = os.path.splitext(os.path.basename(script_file))[0]
+    directory = directory or os.path.dirname(os.path.abspath(script_file))
+    return os.path.join(directory, f"results_python_{module}.json")
+
+
+def main(cls, script_file, argv=None, **kwargs):
+    """Command-line entry point shared by every test module's __main__ block."""
+    parser = argparse.ArgumentParser(description=f"Run the {cls.__name__} benchmark")
+    parser.add_argument("--runs", type=int, help="number of timed samples")
+    parser.add_argument("--iterations", type=int, help="operations per timed sample (default: calibrate)")
+    parser.add_argument("--target-time", type=float, help="seconds per sample when calibrating")
+    parser.add_argument("--param", action="append", default=[], metavar="KEY=VALUE",
+                        help="constructor argument; VALUE is parsed as JSON when possible")
+    parser.add_argument("--out", help="results file (default: results_python_<module>.json next to the test)")
+    parser.add_argument("--no-variants", action="store_true", help="run the primary configuration only")
+    parser.add_argument("--no-instrument", action="store_true",
+                        help="skip the untimed RSS/allocation/GC pass")
+    parser.add_argument("--store", help="results history database (default: bench_store.DEFAULT_DB)")
+    parser.add_argument("--no-store", action="store_true", help="do not append this run to the results history")
+    parser.add_argument("--profile", nargs="?", const="cprofile", choices=("cprofile", "sampling", "both"),
+                        help="also profile one untimed pass; writes profile_python_<module>.* next to the results")
+    args = parser.parse_args(argv)
+
+    for item in args.param:
+        key, _, value = item.partition("=")
+        try:
+            kwargs[key] = json.loads(value)
+        except ValueError:
+            kwargs[key] = value
+
+    bench = cls(**kwargs)
+    if args.no_instrument:
+        bench.instrumented = False
+    result = bench.run(runs=args.runs, iterations=args.iterations, target_time=args.target_time,
+                       variants=not args.no_variants)
+    out = args.out or results_path(script_file)
+    if args.profile:
+        from bench_profile import profile_benchmark, profile_prefix
+
+        module = os.path.splitext(os.path.basename(script_file))[0]
+        prefix = profile_prefix(module, os.path.dirname(os.path.abspath(out)))
+        result["profile"] = profile_benchmark(bench, prefix, args.profile, result["reps"])
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2)
+    if not args.no_store:
+        from bench_store import DEFAULT_DB, try_record
+
+        try_record(result, os.path.splitext(os.path.basename(script_file))[0], path=args.store or DEFAULT_DB)
+    print(json.dumps(without_raw(result), indent=2))
+    return result
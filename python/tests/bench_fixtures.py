@@ -0,0 +1,90 @@
+"""Seeded, cached test inputs.
+
+A fixture is built by a function taking a random.Random plus its own
+arguments, so the same (name, args, seed) always yields the same data. Built
+fixtures are kept in memory for the life of the process and, when asked,
+on disk under FIXTURE_DIR (pickle, or .npy for numpy arrays) so the next
+process skips the build. Callers get the cached object itself: take a copy
+before mutating it, or pass copy=True.
+"""
+import copy as _copy
+import hashlib
+import os
+import pickle
+import random
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+FIXTURE_DIR = os.environ.get(
+    "BENCH_FIXTURE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".fixtures"))
+# bump when a builder changes what it produces, to invalidate disk caches
+VERSION = 1
+
+_memory = {}
+
+
+def _disk_stem(name, args, seed):
+    digest = hashlib.sha1(repr((VERSION, args, seed)).encode()).hexdigest()[:16]
+    return os.path.join(FIXTURE_DIR, f"{name}-{digest}")
+
+
+def _load(stem):
+    if numpy is not None and os.path.exists(stem + ".npy"):
+        return numpy.load(stem + ".npy")
+    try:
+        with open(stem + ".pkl", "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+
+def _store(stem, value):
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    if numpy is not None and isinstance(value, numpy.ndarray):
+        path = stem + ".npy"
+        tmp = path + f".{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            numpy.save(f, value)
+    else:
+        path = stem + ".pkl"
+        tmp = path + f".{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    # atomic, so suite workers building the same fixture never see half a file
+    os.replace(tmp, path)
+
+
+def fixture(name, builder, *args, seed=0, disk=False, copy=False):
+    """Return builder(random.Random(seed), *args), cached by (name, args, seed)."""
+    key = (name, args, seed)
+    if key not in _memory:
+        value = None
+        if disk:
+            stem = _disk_stem(name, args, seed)
+            value = _load(stem)
+        if value is None:
+            value = builder(random.Random(seed), *args)
+            if disk:
+                _store(stem, value)
+        _memory[key] = value
+    value = _memory[key]
+    return _copy.deepcopy(value) if copy else value
+
+
+def clear(disk=False):
+    """Drop the in-memory cache, and the on-disk one too when disk=True."""
+    _memory.clear()
+    if disk and os.path.isdir(FIXTURE_DIR):
+        for entry in os.listdir(FIXTURE_DIR):
+            os.remove(os.path.join(FIXTURE_DIR, entry))
+
+
+def random_ints(rng, n, lo=0, hi=1_000_000):
+    return [rng.randint(lo, hi) for _ in range(n)]
+
+
+def random_matrix(rng, rows, cols):
+    return [[rng.random() for _ in range(cols)] for _ in range(rows)]
@@ -0,0 +1,20 @@
+"""match-statement workloads (Python 3.10+).
+
+Kept apart because the syntax alone makes a module a SyntaxError on older
+interpreters; tests import from here behind a version guard.
+"""
+
+
+def classify_match(n):
+    acc = 0
+    for i in range(1, n + 1):
+        match i % 15:
+            case 0:
+                acc += i * 2
+            case 5 | 10:
+                acc -= i
+            case 3 | 6 | 9 | 12:
+                acc += i // 2
+            case _:
+                acc += (i & 1)
+    return acc
@@ -0,0 +1,126 @@
+"""Profiler capture for a single benchmark configuration.
+
+profile_benchmark() runs a test's workload for one extra, untimed pass
+under cProfile (written as .pstats) and/or a low-overhead sampling profiler
+(written as collapsed stacks, one "outer;inner count" line per stack,
+ready for flamegraph.pl or speedscope). Files land next to the results:
+
+    profile_python_<test>.pstats
+    profile_python_<test>.collapsed
+"""
+import cProfile
+import collections
+import os
+import signal
+import sys
+import threading
+
+MODES = ("cprofile", "sampling", "both")
+
+
+def profile_prefix(test, directory):
+    return os.path.join(directory, f"profile_python_{test}")
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def collapse(frame):
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler:
+    """Samples the main thread's stack every `interval` seconds of CPU time.
+
+    Uses a SIGPROF interval timer where the platform has one, otherwise a
+    background thread reading sys._current_frames() on wall-clock time.
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._thread = None
+        self._stop = None
+        self._previous = None
+
+    @property
+    def samples(self):
+        return sum(self.stacks.values())
+
+    def _on_signal(self, signum, frame):
+        self.stacks[collapse(frame)] += 1
+
+    def _poll(self, target):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+
+    def start(self):
+        on_main = threading.current_thread() is threading.main_thread()
+        if on_main and hasattr(signal, "setitimer") and hasattr(signal, "SIGPROF"):
+            self._previous = signal.signal(signal.SIGPROF, self._on_signal)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        else:
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._poll, args=(threading.get_ident(),), daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        else:
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self._previous)
+
+    def write_collapsed(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _pass(bench, reps):
+    bench.counters = {}
+    bench.prepare(reps)
+    workload = bench.workload
+    for _ in range(reps):
+        workload()
+
+
+def profile_benchmark(bench, prefix, mode="cprofile", reps=1):
+    """Profile reps workload() calls of bench's current configuration."""
+    if mode not in MODES:
+        raise ValueError(f"unknown profile mode {mode!r}")
+    out = {"mode": mode, "reps": reps}
+    bench.setup()
+    try:
+        if mode in ("cprofile", "both"):
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                _pass(bench, reps)
+            finally:
+                profiler.disable()
+            out["pstats"] = prefix + ".pstats"
+            profiler.dump_stats(out["pstats"])
+        if mode in ("sampling", "both"):
+            sampler = SamplingProfiler()
+            sampler.start()
+            try:
+                _pass(bench, reps)
+            finally:
+                sampler.stop()
+            out["collapsed"] = prefix + ".collapsed"
+            out["samples"] = sampler.samples
+            sampler.write_collapsed(out["collapsed"])
+    finally:
+        bench.teardown()
+    return out
@@ -0,0 +1,360 @@
+"""Append-only SQLite history of benchmark results.
+
+Every recorded result (and each of its variants) becomes one row keyed by
+language, test, parameters, interpreter, git commit and host fingerprint,
+with its raw per-sample ops/sec kept alongside, so any two revisions or
+interpreters can be compared statistically later.
+
+    python bench_store.py import ../../ruby/tests/results_ruby_*.json --lang ruby
+    python bench_store.py history arithmetic
+    python bench_store.py compare <base-commit> <head-commit>
+    python bench_store.py compare "CPython 3.11.7" "CPython 3.12.4" --by interpreter
+
+compare runs a two-sided Mann-Whitney U test per matching configuration
+and exits 1 when any configuration got significantly slower.
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+# BENCH_STORE= (empty) turns recording off
+DEFAULT_DB = os.environ.get("BENCH_STORE", os.path.join(TESTS_DIR, "bench_results.sqlite"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    test TEXT NOT NULL,
+    params TEXT NOT NULL,
+    interpreter TEXT,
+    git_commit TEXT,
+    git_dirty INTEGER,
+    host TEXT,
+    host_info TEXT,
+    median_ops_per_sec REAL,
+    result TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_key ON runs (lang, test, params, interpreter, host);
+CREATE TABLE IF NOT EXISTS samples (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    idx INTEGER NOT NULL,
+    time_s REAL,
+    ops_per_sec REAL
+);
+CREATE INDEX IF NOT EXISTS samples_run ON samples (run_id);
+"""
+
+_git = None
+
+
+def connect(path=DEFAULT_DB):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def git_revision(cwd=TESTS_DIR):
+    """(commit, dirty) of the working tree, or (None, None) outside git."""
+    global _git
+    if _git is None:
+        try:
+            commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=cwd, capture_output=True,
+                                    text=True, check=True).stdout.strip()
+            status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=cwd,
+                                    capture_output=True, text=True, check=True).stdout
+            _git = (commit, bool(status.strip()))
+        except (OSError, subprocess.CalledProcessError):
+            _git = (None, None)
+    return _git
+
+
+def host_fingerprint():
+    info = {
+        "node": platform.node(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "system": platform.system(),
+        "release": platform.release(),
+    }
+    digest = hashlib.sha1(json.dumps(info, sort_keys=True).encode()).hexdigest()[:12]
+    return digest, info
+
+
+def interpreter_version():
+    return f"{platform.python_implementation()} {platform.python_version()}"
+
+
+# the ruby tests predate the shared schema and spell the same numbers several ways
+_RESULT_ALIASES = {
+    "median_ops_per_sec": ("median_ops_per_s",),
+    "median_time_s": ("median_time_sec", "median_total_s", "median_total_time_s"),
+}
+_SAMPLE_ALIASES = {
+    "ops_per_sec": ("ops_per_s",),
+    "time_s": ("time_sec", "total_s", "total_time_s"),
+}
+
+
+def _aliased(d, aliases):
+    out = dict(d)
+    for key, spellings in aliases.items():
+        if out.get(key) is None:
+            out[key] = next((d[k] for k in spellings if d.get(k) is not None), None)
+    return out
+
+
+def normalize(result):
+    """Copy of result with the ruby key spellings mapped onto the python ones."""
+    row = _aliased(result, _RESULT_ALIASES)
+    row["raw"] = [_aliased(s, _SAMPLE_ALIASES) for s in result.get("raw", ()) if isinstance(s, dict)]
+    if row["median_ops_per_sec"] is None:
+        rates = [s["ops_per_sec"] for s in row["raw"] if isinstance(s["ops_per_sec"], (int, float))]
+        row["median_ops_per_sec"] = statistics.median(rates) if rates else None
+    return row
+
+
+def _rows(result):
+    yield normalize(result)
+    for variant in result.get("variants", ()):
+        if "skipped" not in variant and "error" not in variant:
+            yield normalize(variant)
+
+
+def record(result, test, lang="python", path=DEFAULT_DB, interpreter=None, commit=None):
+    """Append result and its variants; returns the new run ids."""
+    if not path:
+        return []
+    if commit is None:
+        commit, dirty = git_revision()
+    else:
+        dirty = None
+    host, info = host_fingerprint()
+    if interpreter is None and lang == "python":
+        interpreter = interpreter_version()
+    now = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+    ids = []
+    with connect(path) as conn:
+        for row in _rows(result):
+            stored = {k: v for k, v in row.items() if k not in ("raw", "variants")}
+            cur = conn.execute(
+                "INSERT INTO runs (created_at, lang, test, params, interpreter, git_commit, git_dirty,"
+                " host, host_info, median_ops_per_sec, result) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (now, lang, test, json.dumps(row.get("params", {}), sort_keys=True), interpreter,
+                 commit, dirty, host, json.dumps(info, sort_keys=True), row.get("median_ops_per_sec"),
+                 json.dumps(stored)))
+            conn.executemany(
+                "INSERT INTO samples (run_id, idx, time_s, ops_per_sec) VALUES (?, ?, ?, ?)",
+                [(cur.lastrowid, i, s.get("time_s"), s.get("ops_per_sec")) for i, s in enumerate(row.get("raw", ()))])
+            ids.append(cur.lastrowid)
+    return ids
+
+
+def try_record(result, test, **kwargs):
+    """record(), reporting instead of raising: history must never fail a benchmark run."""
+    try:
+        return record(result, test, **kwargs)
+    except (sqlite3.Error, OSError) as e:
+        print(f"warning: could not record {test} in results store: {e}", file=sys.stderr)
+        return []
+
+
+# ---------- statistics ----------
+
+def _exact_u_distribution(n1, n2):
+    # counts[u] = number of orderings of n1 a's and n2 b's with U statistic u
+    counts = [[[1] if i == 0 or j == 0 else None for j in range(n2 + 1)] for i in range(n1 + 1)]
+    for i in range(1, n1 + 1):
+        for j in range(1, n2 + 1):
+            take_a, take_b = counts[i - 1][j], counts[i][j - 1]
+            dist = [0] * (i * j + 1)
+            for u, c in enumerate(take_a):
+                dist[u + j] += c
+            for u, c in enumerate(take_b):
+                dist[u] += c
+            counts[i][j] = dist
+    return counts[n1][n2]
+
+
+def mann_whitney_u(a, b):
+    """Two-sided Mann-Whitney U test; returns (U of a, p-value).
+
+    Exact for small tie-free samples, otherwise the normal approximation
+    with tie and continuity corrections.
+    """
+    n1, n2 = len(a), len(b)
+    if not n1 or not n2:
+        return float("nan"), 1.0
+    pooled = sorted([(v, 0) for v in a] + [(v, 1) for v in b])
+    n = n1 + n2
+    ranks, ties, i = [0.0] * n, 0, 0
+    while i < n:
+        j = i
+        while j + 1 < n and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        t = j - i + 1
+        ties += t ** 3 - t
+        i = j + 1
+    u = sum(r for r, (_, group) in zip(ranks, pooled) if group == 0) - n1 * (n1 + 1) / 2
+    mean = n1 * n2 / 2
+    if not ties and n1 <= 20 and n2 <= 20:
+        dist = _exact_u_distribution(n1, n2)
+        extreme = min(u, n1 * n2 - u)
+        tail = sum(dist[:int(extreme) + 1]) / math.comb(n, n1)
+        return u, min(1.0, 2 * tail)
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1))))
+    if sigma == 0:
+        return u, 1.0
+    z = max(0.0, abs(u - mean) - 0.5) / sigma
+    return u, min(1.0, math.erfc(z / math.sqrt(2)))
+
+
+def ratio_ci(base, head, level=0.95, resamples=2000, seed=0):
+    """Bootstrap CI of median(head) / median(base)."""
+    rng = random.Random(seed)
+    estimates = []
+    for _ in range(resamples):
+        mb = statistics.median(rng.choice(base) for _ in base)
+        mh = statistics.median(rng.choice(head) for _ in head)
+        estimates.append(mh / mb if mb else float("nan"))
+    estimates.sort()
+    tail = (1.0 - level) / 2
+    return [estimates[int(tail * (resamples - 1))], estimates[int((1 - tail) * (resamples - 1))]]
+
+
+# ---------- queries ----------
+
+def _samples(conn, where, args):
+    rows = conn.execute(
+        "SELECT r.lang, r.test, r.params, r.interpreter, r.git_commit, r.host, s.ops_per_sec"
+        f" FROM runs r JOIN samples s ON s.run_id = r.id WHERE s.ops_per_sec IS NOT NULL AND {where}", args)
+    return rows.fetchall()
+
+
+def _resolve(rev):
+    try:
+        return subprocess.run(["git", "rev-parse", rev], cwd=TESTS_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return rev
+
+
+def compare(conn, base, head, by="commit", test=None, alpha=0.05, threshold=0.02):
+    """Per-configuration comparison of base vs head; by is "commit" or "interpreter"."""
+    if by == "commit":
+        column, base, head = "git_commit", _resolve(base), _resolve(head)
+        where = "r.git_commit LIKE ? || '%'"
+    else:
+        column, where = "interpreter", "r.interpreter = ?"
+    extra, extra_args = ("", ()) if test is None else (" AND r.test = ?", (test,))
+    groups = {}
+    for side, rev in (("base", base), ("head", head)):
+        for lang, name, params, interp, commit, host, ops in _samples(conn, where + extra, (rev,) + extra_args):
+            # the compared dimension is left out of the key, everything else must match
+            key = (lang, name, params, host) + ((interp,) if column == "git_commit" else (commit,))
+            groups.setdefault(key, {"base": [], "head": []})[side].append(ops)
+    report = []
+    for key, sides in sorted(groups.items(), key=lambda kv: tuple(str(k) for k in kv[0])):
+        a, b = sides["base"], sides["head"]
+        if not a or not b:
+            continue
+        _, p = mann_whitney_u(a, b)
+        change = statistics.median(b) / statistics.median(a) - 1
+        report.append({
+            "lang": key[0], "test": key[1], "params": json.loads(key[2]),
+            "base_median": statistics.median(a), "head_median": statistics.median(b),
+            "change": change, "ratio_ci95": ratio_ci(a, b), "p_value": p,
+            "n_base": len(a), "n_head": len(b),
+            "slower": p < alpha and change < -threshold,
+            "faster": p < alpha and change > threshold,
+        })
+    return report
+
+
+def history(conn, test, lang="python", limit=20):
+    rows = conn.execute(
+        "SELECT created_at, git_commit, git_dirty, interpreter, host, params, median_ops_per_sec"
+        " FROM runs WHERE test = ? AND lang = ? ORDER BY id DESC LIMIT ?", (test, lang, limit))
+    return rows.fetchall()
+
+
+def _test_from_filename(path):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    for prefix in ("results_python_", "results_ruby_"):
+        if stem.startswith(prefix):
+            return stem[len(prefix):]
+    return stem
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark results history")
+    parser.add_argument("--db", default=DEFAULT_DB or os.path.join(TESTS_DIR, "bench_results.sqlite"))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_import = sub.add_parser("import", help="record existing results_*.json files")
+    p_import.add_argument("files", nargs="+")
+    p_import.add_argument("--lang", default="python")
+    p_import.add_argument("--interpreter")
+    p_import.add_argument("--commit", help="revision the files were produced at (default: current)")
+
+    p_hist = sub.add_parser("history", help="recent runs of one test")
+    p_hist.add_argument("test")
+    p_hist.add_argument("--lang", default="python")
+    p_hist.add_argument("--limit", type=int, default=20)
+
+    p_cmp = sub.add_parser("compare", help="flag significant changes between two revisions")
+    p_cmp.add_argument("base")
+    p_cmp.add_argument("head")
+    p_cmp.add_argument("--by", choices=("commit", "interpreter"), default="commit")
+    p_cmp.add_argument("--test")
+    p_cmp.add_argument("--alpha", type=float, default=0.05)
+    p_cmp.add_argument("--threshold", type=float, default=0.02, help="minimum relative change to flag")
+    p_cmp.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        for path in args.files:
+            with open(path) as f:
+                result = json.load(f)
+            ids = record(result, _test_from_filename(path), lang=args.lang, path=args.db,
+                         interpreter=args.interpreter, commit=args.commit and _resolve(args.commit))
+            print(f"{path}: {len(ids)} rows")
+        return 0
+
+    conn = connect(args.db)
+    if args.command == "history":
+        for created, commit, dirty, interp, host, params, ops in history(conn, args.test, args.lang, args.limit):
+            rev = (commit or "-")[:10] + ("+" if dirty else "")
+            ops = "-" if ops is None else f"{ops:.1f}"
+            print(f"{created}  {rev:<11}  {interp or '-':<16}  {host}  {ops:>16}  {params}")
+        return 0
+
+    report = compare(conn, args.base, args.head, args.by, args.test, args.alpha, args.threshold)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for r in report:
+            flag = "SLOWER" if r["slower"] else "faster" if r["faster"] else ""
+            lo, hi = r["ratio_ci95"]
+            print(f"{r['lang']}/{r['test']:<28} {r['change']:+7.1%}  ci95 [{lo:.3f}, {hi:.3f}]  "
+                  f"p={r['p_value']:.4f}  n={r['n_base']}/{r['n_head']}  {flag}  {json.dumps(r['params'])}")
+        if not report:
+            print("no configurations recorded at both revisions")
+    return 1 if any(r["slower"] for r in report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""Suite scheduler for the python benchmarks.
+
+Runs independent tests in a process pool where every worker is pinned to its
+own core, so concurrent tests do not steal cycles from each other. Concurrency
+is capped at the number of isolated cores (/sys/devices/system/cpu/isolated,
+falling back to the cores this process may use). Tests marked
+``exclusive = True`` (they spread their own work over several cores) always
+run alone afterwards with the full core set.
+
+--serial is the "quiet machine" mode for reference numbers: one test at a
+time, pinned to a single core, in this process.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from bench_worker import TESTS_DIR, load_test, run_job
+
+
+def discover_tests(directory=TESTS_DIR):
+    names = []
+    for fname in sorted(os.listdir(directory)):
+        base, ext = os.path.splitext(fname)
+        if ext == ".py" and not base.startswith("bench_"):
+            names.append(base)
+    return names
+
+
+def parse_cpu_list(text):
+    """Parse the kernel cpu-list format, e.g. "2-5,8"."""
+    cores = set()
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-")
+            cores.update(range(int(lo), int(hi) + 1))
+        else:
+            cores.add(int(part))
+    return cores
+
+
+def available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return set(os.sched_getaffinity(0))
+    return set(range(os.cpu_count() or 1))
+
+
+def isolated_cores():
+    try:
+        with open("/sys/devices/system/cpu/isolated") as f:
+            return parse_cpu_list(f.read())
+    except OSError:
+        return set()
+
+
+def choose_cores(requested=None):
+    allowed = available_cores()
+    if requested:
+        return sorted(parse_cpu_list(requested) & allowed)
+    isolated = isolated_cores() & allowed
+    return sorted(isolated or allowed)
+
+
+def pin_to(core):
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {core})
+
+
+def _init_worker(core_queue):
+    pin_to(core_queue.get())
+
+
+def _pool_job(job, results_dir):
+    reply = run_job(job, results_dir)
+    if hasattr(os, "sched_getaffinity"):
+        reply["cores"] = sorted(os.sched_getaffinity(0))
+    return reply
+
+
+def _failed(job, error):
+    return {"test": job.get("test"), "ok": False, "error": error}
+
+
+def _run_pool(jobs, results_dir, cores):
+    """Run jobs on a pool pinned to cores; yields one reply per job, failures included.
+
+    A worker that dies (OOM kill, segfault) breaks the whole pool and every job
+    still in it. Those jobs are retried one at a time in fresh single-worker
+    pools, so only the one that actually crashes is reported as failed."""
+    ctx = multiprocessing.get_context()
+    core_queue = ctx.Queue()
+    for core in cores:
+        core_queue.put(core)
+    broken = []
+    with ProcessPoolExecutor(max_workers=len(cores), mp_context=ctx,
+                             initializer=_init_worker, initargs=(core_queue,)) as pool:
+        futures = {pool.submit(_pool_job, job, results_dir): job for job in jobs}
+        for fut in as_completed(futures):
+            try:
+                yield fut.result()
+            except BrokenProcessPool:
+                broken.append(futures[fut])
+            except Exception as e:
+                yield _failed(futures[fut], f"{type(e).__name__}: {e}")
+    for job in broken:
+        if len(jobs) == 1:
+            yield _failed(job, "worker process died (killed or crashed)")
+        else:
+            yield from _run_pool([job], results_dir, cores[:1])
+
+
+def _run_here(job, results_dir, cores):
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, set(cores))
+    reply = run_job(job, results_dir)
+    reply["cores"] = list(cores)
+    return reply
+
+
+def _is_exclusive(test):
+    try:
+        return getattr(load_test(test), "exclusive", False)
+    except Exception:
+        # let the worker report the import error
+        return False
+
+
+def run_suite(jobs, cores, serial=False, results_dir=None, on_result=None):
+    on_result = on_result or (lambda reply: None)
+    replies = []
+
+    def done(reply):
+        replies.append(reply)
+        on_result(reply)
+
+    original = available_cores()
+    try:
+        if serial:
+            for job in jobs:
+                done(_run_here(job, results_dir, cores[:1]))
+            return replies
+
+        shared = [j for j in jobs if not _is_exclusive(j["test"])]
+        exclusive = [j for j in jobs if _is_exclusive(j["test"])]
+
+        if shared:
+            for reply in _run_pool(shared, results_dir, cores):
+                done(reply)
+
+        for job in exclusive:
+            done(_run_here(job, results_dir, cores))
+    finally:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, original)
+    return replies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the python benchmark suite")
+    parser.add_argument("tests", nargs="*", help="test modules to run (default: all)")
+    parser.add_argument("--serial", action="store_true", help="one test at a time on a single core")
+    parser.add_argument("--cores", help="cpu list to use, e.g. 2-5 (default: isolated cores, else all allowed)")
+    parser.add_argument("--runs", type=int)
+    parser.add_argument("--iterations", type=int)
+    parser.add_argument("--target-time", type=float)
+    parser.add_argument("--no-variants", action="store_true", help="run each test's primary configuration only")
+    parser.add_argument("--results-dir", default=TESTS_DIR)
+    parser.add_argument("--store", help="results history database (default: bench_store.DEFAULT_DB)")
+    parser.add_argument("--no-store", action="store_true", help="do not record results in the history")
+    parser.add_argument("--profile", nargs="?", const="cprofile", choices=("cprofile", "sampling", "both"),
+                        help="profile one extra untimed pass of every test")
+    args = parser.parse_args(argv)
+
+    cores = choose_cores(args.cores)
+    if not cores:
+        parser.error("no usable cores")
+    if not args.cores and not isolated_cores():
+        print("note: no isolated cores found; sharing cores with the rest of the system", file=sys.stderr)
+    if args.serial and hasattr(os, "getloadavg") and os.getloadavg()[0] > 1.0:
+        print(f"warning: load average {os.getloadavg()[0]:.2f}; reference numbers may be noisy", file=sys.stderr)
+
+    jobs = []
+    for test in args.tests or discover_tests():
+        job = {"test": test}
+        for key in ("runs", "iterations", "target_time", "profile", "store"):
+            if getattr(args, key) is not None:
+                job[key] = getattr(args, key)
+        if args.no_store:
+            job["store"] = ""
+        if args.no_variants:
+            job["variants"] = False
+        jobs.append(job)
+
+    def report(reply):
+        if reply["ok"]:
+            res = reply["result"]
+            print(f"[DONE  {reply['test']}] cores={reply['cores']} "
+                  f"median_ops_per_sec={res['median_ops_per_sec']:.0f} wall={reply['wall_s']:.2f}s")
+        else:
+            print(f"[FAIL  {reply['test']}] {reply['error']}")
+        sys.stdout.flush()
+
+    mode = "serial" if args.serial else f"{len(cores)} pinned workers"
+    print(f"Running {len(jobs)} tests ({mode}, cores {cores})")
+    t0 = time.perf_counter()
+    replies = run_suite(jobs, cores, serial=args.serial, results_dir=args.results_dir, on_result=report)
+    failed = [r["test"] for r in replies if not r["ok"]]
+    print(json.dumps({"wall_s": time.perf_counter() - t0, "failed": failed}))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""Long-lived benchmark worker.
+
+Reads one JSON job per line and answers with one JSON result line per job.
+Test modules are imported once and reused, so a suite run pays interpreter
+startup a single time instead of once per test.
+
+    job:    {"test": "arithmetic", "runs": 5, "iterations": 10000000, "params": {}}
+    result: {"test": "arithmetic", "ok": true, "result": {...}}
+
+"iterations" pins the work per sample of the primary configuration; leave it
+out (optionally with "target_time") to let the test calibrate its own
+repetition count. Variants always calibrate. "variants": false runs the
+primary configuration only.
+"profile" ("cprofile", "sampling" or "both") adds an untimed profiled pass,
+written as profile_python_<test>.* next to the results.
+Every result is also appended to the bench_store history; "store" names
+another database, or "" to skip it.
+
+Jobs come from stdin by default, or from a Unix socket with --socket.
+"""
+import argparse
+import importlib
+import json
+import os
+import socketserver
+import sys
+import time
+import traceback
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+from bench_profile import profile_benchmark, profile_prefix
+from bench_store import DEFAULT_DB, try_record
+
+_classes = {}
+
+
+def class_name_for(test):
+    # Mirrors snake_to_camel_test() in runner.c
+    parts = test.replace("-", "_").split("_")
+    return "".join(p[:1].upper() + p[1:] for p in parts if p) + "Test"
+
+
+def load_test(test):
+    cls = _classes.get(test)
+    if cls is None:
+        module = importlib.import_module(test)
+        cls = getattr(module, class_name_for(test))
+        _classes[test] = cls
+    return cls
+
+
+def run_job(job, results_dir=None, store=DEFAULT_DB):
+    if not isinstance(job, dict):
+        return {"ok": False, "error": f"bad job line: expected a JSON object, got {type(job).__name__}"}
+    test = job.get("test")
+    t0 = time.perf_counter()
+    try:
+        cls = load_test(test)
+        instance = cls(**job.get("params", {}))
+        run_kwargs = {k: job[k] for k in ("runs", "iterations", "target_time") if job.get(k) is not None}
+        result = instance.run(variants=job.get("variants", True), **run_kwargs)
+        if job.get("profile"):
+            prefix = profile_prefix(test, results_dir or TESTS_DIR)
+            result["profile"] = profile_benchmark(instance, prefix, job["profile"], result["reps"])
+        if results_dir:
+            out = os.path.join(results_dir, f"results_python_{test}.json")
+            with open(out, "w") as f:
+                json.dump(result, f, indent=2)
+    except Exception as e:
+        return {
+            "test": test,
+            "ok": False,
+            "error": f"{type(e).__name__}: {e}",
+            "traceback": traceback.format_exc(),
+        }
+
+    try_record(result, test, path=job.get("store", store))
+
+    return {
+        "test": test,
+        "ok": True,
+        "wall_s": time.perf_counter() - t0,
+        "result": result,
+    }
+
+
+def serve_lines(lines, write, results_dir=None, store=DEFAULT_DB):
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+        except ValueError as e:
+            reply = {"ok": False, "error": f"bad job line: {e}"}
+        else:
+            reply = run_job(job, results_dir, store)
+        write(json.dumps(reply) + "\n")
+
+
+def serve_stdin(results_dir=None, store=DEFAULT_DB):
+    def write(s):
+        sys.stdout.write(s)
+        sys.stdout.flush()
+
+    serve_lines(sys.stdin, write, results_dir, store)
+
+
+def serve_socket(path, results_dir=None, store=DEFAULT_DB):
+    if os.path.exists(path):
+        os.remove(path)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            def write(s):
+                self.wfile.write(s.encode())
+                self.wfile.flush()
+
+            lines = (raw.decode() for raw in self.rfile)
+            serve_lines(lines, write, results_dir, store)
+
+    # Single-threaded on purpose: jobs never overlap and disturb each other's timings
+    with socketserver.UnixStreamServer(path, Handler) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Persistent Python benchmark worker")
+    parser.add_argument("--socket", help="serve jobs on this Unix socket path instead of stdin")
+    parser.add_argument("--results-dir", help="also write results_python_<test>.json here")
+    parser.add_argument("--store", default=DEFAULT_DB, help="results history database")
+    parser.add_argument("--no-store", action="store_true", help="do not record results in the history")
+    args = parser.parse_args(argv)
+
+    store = "" if args.no_store else args.store
+    if args.socket:
+        serve_socket(args.socket, args.results_dir, store)
+    else:
+        serve_stdin(args.results_dir, store)
+
+
+if __name__ == "__main__":
+    main()
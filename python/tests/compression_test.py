@@ -1,58 +1,374 @@
-import time
+import bz2
 import json
+import lzma
+import random
+import struct
+import tempfile
+import time
 import zlib
-import gc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from bench_core import Benchmark, Skip, default_worker_counts, main, traced_peak
+
+try:
+    from compression import zstd  # 3.14+
+except ImportError:
+    zstd = None
+
+KB = 1024
+MB = 1024 * KB
+CODECS = ("zlib", "bz2", "lzma", "zstd") if zstd else ("zlib", "bz2", "lzma")
+LEVELS = {
+    "zlib": tuple(range(1, 10)),
+    "bz2": (1, 5, 9),
+    "lzma": (0, 3, 6, 9),
+    "zstd": (1, 3, 9, 19),
+}
+DEFAULT_LEVELS = {"zlib": 6, "bz2": 9, "lzma": 6, "zstd": 3}
+INPUT_KINDS = ("random", "text", "json")
+INPUT_SIZES = (64 * KB, MB, 8 * MB)
+PARALLEL_EXECUTORS = ("threads", "processes")
+# large parallel inputs repeat a seeded block of this size; each frame is an
+# independent stream far smaller than the block, so the ratio is unaffected
+TILE_SIZE = 16 * MB
+FRAME_HEADER = struct.Struct(">I")
+
+_WORDS = (
+    "the of and to in is that for it as was with be by on not he this are or his from at "
+    "which but have an they you were her she there been one all we their has would when "
+    "archive backup stream record latency buffer codec entropy pipeline throughput window"
+).split()
+
+
+def make_input(kind, size, seed=0):
+    rng = random.Random(seed)
+    if kind == "sentence":
+        return ("The quick brown fox jumps over the lazy dog. " * 100).encode()
+    if kind == "random":
+        return rng.randbytes(size)
+    parts, total = [], 0
+    if kind == "text":
+        # Zipf-like word frequencies, roughly natural-language compressibility
+        weights = [1.0 / (i + 1) for i in range(len(_WORDS))]
+        while total < size:
+            line = " ".join(rng.choices(_WORDS, weights, k=12)).capitalize() + ".\n"
+            parts.append(line)
+            total += len(line)
+    elif kind == "json":
+        i = 0
+        while total < size:
+            line = json.dumps({
+                "id": i,
+                "ts": 1_700_000_000 + rng.randrange(86_400),
+                "user": f"user_{rng.randrange(10_000)}",
+                "event": rng.choice(("click", "view", "purchase", "login")),
+                "value": round(rng.random() * 100, 3),
+            }) + "\n"
+            parts.append(line)
+            total += len(line)
+            i += 1
+    else:
+        raise ValueError(f"unknown input kind {kind!r}")
+    return "".join(parts).encode()[:size]
+
+
+def make_large_input(kind, size, seed=0):
+    if size is None or size <= TILE_SIZE:
+        return make_input(kind, size, seed)
+    tile = make_input(kind, TILE_SIZE, seed)
+    reps, rest = divmod(size, TILE_SIZE)
+    return tile * reps + tile[:rest]
+
+
+def _compress_frame(codec, level, chunk):
+    return one_shot(codec, level)[0](chunk)
+
+
+def _decompress_frame(codec, frame):
+    return one_shot(codec, 0)[1](frame)
+
+
+def pack_frames(frames):
+    """Length-prefixed container: a 4-byte big-endian size before every compressed chunk."""
+    out = bytearray()
+    for frame in frames:
+        out += FRAME_HEADER.pack(len(frame))
+        out += frame
+    return bytes(out)
+
+
+def unpack_frames(container):
+    view = memoryview(container)
+    frames, off = [], 0
+    while off < len(view):
+        (length,) = FRAME_HEADER.unpack_from(view, off)
+        off += FRAME_HEADER.size
+        frames.append(view[off:off + length])
+        off += length
+    return frames
+
 
-class CompressionTestTest:
-    def __init__(self, name="CompressionTest", ops_per_iter=1000):
+def one_shot(codec, level):
+    if codec == "zlib":
+        return (lambda d: zlib.compress(d, level)), zlib.decompress
+    if codec == "bz2":
+        return (lambda d: bz2.compress(d, level)), bz2.decompress
+    if codec == "lzma":
+        return (lambda d: lzma.compress(d, preset=level)), lzma.decompress
+    if codec == "zstd":
+        return (lambda d: zstd.compress(d, level=level)), zstd.decompress
+    raise ValueError(f"unknown codec {codec!r}")
+
+
+def stream_objects(codec, level):
+    if codec == "zlib":
+        return (lambda: zlib.compressobj(level)), zlib.decompressobj
+    if codec == "bz2":
+        return (lambda: bz2.BZ2Compressor(level)), bz2.BZ2Decompressor
+    if codec == "lzma":
+        return (lambda: lzma.LZMACompressor(preset=level)), lzma.LZMADecompressor
+    if codec == "zstd":
+        return (lambda: zstd.ZstdCompressor(level=level)), zstd.ZstdDecompressor
+    raise ValueError(f"unknown codec {codec!r}")
+
+
+class CompressionTestTest(Benchmark):
+    # the parallel sweep spreads chunks over a thread/process pool
+    exclusive = True
+
+    def __init__(self, name="CompressionTest", ops_per_iter=None, codec="zlib", level=-1,
+                 input_kind="sentence", input_size=None, streaming=False, chunk_size=MB,
+                 codecs=CODECS, input_kinds=INPUT_KINDS, input_sizes=INPUT_SIZES, sweep_size=256 * KB,
+                 parallel=None, workers=1, parallel_size=256 * MB, parallel_chunk=MB, parallel_level=1,
+                 parallel_codecs=("zlib",), worker_counts=None):
+        super().__init__(ops_per_iter)
         self.name = name
-        self.ops_per_iter = ops_per_iter
-        self.data = ("The quick brown fox jumps over the lazy dog. " * 100).encode()
-
-    def run_once(self, iterations):
-        # Cap iterations to avoid CPU overload
-        effective_iters = min(iterations, 100_000)
-        start = time.perf_counter()
-
-        for _ in range(effective_iters):
-            compressed = zlib.compress(self.data)
-            decompressed = zlib.decompress(compressed)
-            if decompressed != self.data:
-                raise ValueError("Data mismatch after decompression")
+        self.codec = codec
+        self.level = level
+        self.input_kind = input_kind
+        self.input_size = input_size
+        self.streaming = streaming
+        self.chunk_size = chunk_size
+        self.codecs = codecs
+        self.input_kinds = input_kinds
+        self.input_sizes = input_sizes
+        self.sweep_size = sweep_size
+        self.parallel = parallel
+        self.workers = workers
+        self.parallel_size = parallel_size
+        self.parallel_chunk = parallel_chunk
+        self.parallel_level = parallel_level
+        self.parallel_codecs = parallel_codecs
+        self.worker_counts = worker_counts or default_worker_counts()
+        self._inputs = {}
+        self.data = self._input()
 
-        end = time.perf_counter()
-        time_s = end - start
-        ops_per_sec = effective_iters / time_s if time_s > 0 else 0
-        return {
-            "time_s": time_s,
-            "ops_per_sec": ops_per_sec,
-            "iterations": effective_iters
-        }
+    def _input(self):
+        key = (self.input_kind, self.input_size)
+        if key not in self._inputs:
+            self._inputs[key] = make_large_input(self.input_kind, self.input_size)
+        return self._inputs[key]
+
+    def params(self):
+        p = {"codec": self.codec, "level": self.level, "input_kind": self.input_kind,
+             "input_bytes": len(self.data), "streaming": self.streaming,
+             "chunk_size": self.chunk_size if self.streaming else None}
+        if self.parallel:
+            p.update(parallel=self.parallel, workers=self.workers, chunk_size=self.parallel_chunk)
+        return p
 
-    def run(self, runs=5, iterations=None):
-        if iterations is None:
-            iterations = self.ops_per_iter
+    def variants(self):
+        out = [{"codec": c, "level": lvl, "input_kind": k, "input_size": self.sweep_size}
+               for c in self.codecs for lvl in LEVELS[c] for k in self.input_kinds]
+        out += [{"codec": "zlib", "level": 6, "input_kind": "text", "input_size": n}
+                for n in self.input_sizes]
+        largest = max(self.input_sizes)
+        out += [{"codec": c, "level": DEFAULT_LEVELS[c], "input_kind": "text",
+                 "input_size": largest, "streaming": True} for c in self.codecs]
+        out += [{"codec": c, "level": self.parallel_level, "input_kind": "text",
+                 "input_size": self.parallel_size, "parallel": e, "workers": w}
+                for c in self.parallel_codecs for e in PARALLEL_EXECUTORS for w in self.worker_counts]
+        return out
 
-        results = []
-        for _ in range(runs):
-            results.append(self.run_once(iterations))
-            gc.collect()
+    def setup(self):
+        if self.codec == "zstd" and zstd is None:
+            raise Skip("compression.zstd needs Python 3.14+")
+        self.data = self._input()
+        self.compress, self.decompress = one_shot(self.codec, self.level)
+        self.make_compressor, self.make_decompressor = stream_objects(self.codec, self.level)
+        self.compressed_len = 0
+        self.pool = None
+        self.sink = tempfile.TemporaryFile() if self.streaming else None
+        if self.parallel == "threads":
+            self.pool = ThreadPoolExecutor(max_workers=self.workers)
+        elif self.parallel == "processes":
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        # tracemalloc cannot see pool processes, and a traced pass over
+        # hundreds of MB costs more than the measurement is worth
+        self.peak_mem_bytes = None if self.parallel else self._measure_peak()
+        if self.streaming:
+            self._check_stream_bounded()
 
-        times = sorted([r["time_s"] for r in results])
-        ops = sorted([r["ops_per_sec"] for r in results])
-        mid = len(times) // 2
+    def teardown(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+        if self.sink is not None:
+            self.sink.close()
 
+    def _check_stream_bounded(self):
+        """The whole point of streaming: peak memory must not grow with the input.
+        A one-chunk round trip gives the codec's own state plus one chunk in and out;
+        the full input may add at most one more chunk on top of that."""
+        full = self.data
+        try:
+            self.data = full[:self.chunk_size]
+            baseline = self._measure_peak()
+        finally:
+            self.data = full
+        limit = baseline + self.chunk_size
+        if self.peak_mem_bytes > limit:
+            raise ValueError(f"streaming peak {self.peak_mem_bytes} B exceeds {limit} B "
+                             f"for {self.chunk_size} B chunks")
+
+    def _measure_peak(self):
+        try:
+            return traced_peak(self.workload)
+        finally:
+            self.counters = {}
+
+    def _io_size(self):
+        # chunk_size is the working-memory budget: I/O moves in quarter chunks, so an
+        # input slice, a codec block it completes (bz2: up to 900 KB) and CPython's
+        # output buffer finalizing it to bytes all fit inside one chunk's headroom
+        return max(1, self.chunk_size // 4)
+
+    def _compress_stream(self):
+        """Compress chunk by chunk into the sink file; returns the compressed size."""
+        comp = self.make_compressor()
+        sink = self.sink
+        sink.seek(0)
+        sink.truncate()
+        step = self._io_size()
+        view = memoryview(self.data)
+        for off in range(0, len(view), step):
+            sink.write(comp.compress(view[off:off + step]))
+        sink.write(comp.flush())
+        return sink.tell()
+
+    def _decompress_stream(self):
+        """Read the sink back in chunks, never holding more than one chunk of output."""
+        decomp = self.make_decompressor()
+        limit, sink, read_size = self.chunk_size, self.sink, self._io_size()
+        sink.seek(0)
+        total = 0
+        # output is consumed chunk by chunk and dropped, never joined
+        if self.codec == "zlib":
+            while block := sink.read(read_size):
+                while block:
+                    total += len(decomp.decompress(block, limit))
+                    block = decomp.unconsumed_tail
+            total += len(decomp.flush())
+        else:
+            while not decomp.eof and (block := sink.read(read_size)):
+                total += len(decomp.decompress(block, limit))
+                while not decomp.needs_input and not decomp.eof:
+                    total += len(decomp.decompress(b"", limit))
+        return total
+
+    def _parallel_round_trip(self):
+        view = memoryview(self.data)
+        chunks = [view[off:off + self.parallel_chunk] for off in range(0, len(view), self.parallel_chunk)]
+        clock = time.perf_counter
+        t0 = clock()
+        if self.parallel == "processes":
+            # memoryviews cannot be pickled; the copy is part of the process-pool cost, both ways
+            chunks = [bytes(c) for c in chunks]
+        frames = self.pool.map(_compress_frame, [self.codec] * len(chunks),
+                               [self.level] * len(chunks), chunks)
+        container = pack_frames(frames)
+        t1 = clock()
+        frames = unpack_frames(container)
+        if self.parallel == "processes":
+            frames = [bytes(f) for f in frames]
+        restored = list(self.pool.map(_decompress_frame, [self.codec] * len(frames), frames))
+        t2 = clock()
+        self.compressed_len = len(container)
+        return t0, t1, t2, sum(len(r) for r in restored) == len(self.data)
+
+    def workload(self):
+        clock = time.perf_counter
+        if self.parallel:
+            t0, t1, t2, ok = self._parallel_round_trip()
+            if not ok:
+                raise ValueError("Data mismatch after decompression")
+            self.counters["compress_s"] = self.counters.get("compress_s", 0.0) + (t1 - t0)
+            self.counters["decompress_s"] = self.counters.get("decompress_s", 0.0) + (t2 - t1)
+            return
+        t0 = clock()
+        if self.streaming:
+            self.compressed_len = self._compress_stream()
+            t1 = clock()
+            restored = self._decompress_stream()
+            ok = restored == len(self.data)
+        else:
+            compressed = self.compress(self.data)
+            t1 = clock()
+            self.compressed_len = len(compressed)
+            decompressed = self.decompress(compressed)
+            ok = decompressed == self.data
+        t2 = clock()
+        if not ok:
+            raise ValueError("Data mismatch after decompression")
+        self.counters["compress_s"] = self.counters.get("compress_s", 0.0) + (t1 - t0)
+        self.counters["decompress_s"] = self.counters.get("decompress_s", 0.0) + (t2 - t1)
+
+    def sample_metrics(self, reps, elapsed):
+        mb = len(self.data) * reps / MB
+        comp_s = self.counters["compress_s"]
+        decomp_s = self.counters["decompress_s"]
         return {
-            "name": self.name,
-            "runs": runs,
-            "median_time_s": times[mid],
-            "median_ops_per_s": ops[mid],
-            "raw": results
+            "compress_s": comp_s,
+            "decompress_s": decomp_s,
+            "compress_MBps": mb / comp_s if comp_s > 0 else 0,
+            "decompress_MBps": mb / decomp_s if decomp_s > 0 else 0,
+            "ratio": len(self.data) / self.compressed_len if self.compressed_len else 0,
+            "peak_mem_bytes": self.peak_mem_bytes,
         }
 
+    def compare_variants(self, primary, variant_results):
+        rows = []
+        for r in variant_results:
+            p = r["params"]
+            rows.append({
+                "codec": p["codec"], "level": p["level"], "input_kind": p["input_kind"],
+                "input_bytes": p["input_bytes"], "streaming": p["streaming"],
+                "ratio": r["median_ratio"],
+                "compress_MBps": r["median_compress_MBps"],
+                "decompress_MBps": r["median_decompress_MBps"],
+                "peak_mem_bytes": r.get("median_peak_mem_bytes"),
+                "parallel": p.get("parallel"),
+                "workers": p.get("workers"),
+            })
+        return {"codec_table": rows, "parallel_scaling": self._parallel_scaling(variant_results)}
+
+    def _parallel_scaling(self, variant_results):
+        curves = {}
+        for r in variant_results:
+            p = r["params"]
+            if not p.get("parallel"):
+                continue
+            curves.setdefault(f"{p['codec']}/{p['parallel']}", []).append(r)
+        out = {}
+        for key, results in curves.items():
+            results.sort(key=lambda r: r["params"]["workers"])
+            base = results[0]
+            out[key] = [{
+                "workers": r["params"]["workers"],
+                "compress_MBps": r["median_compress_MBps"],
+                "decompress_MBps": r["median_decompress_MBps"],
+                "speedup": base["median_time_s"] / r["median_time_s"],
+            } for r in results]
+        return out
 
 if __name__ == "__main__":
-    result = CompressionTestTest().run()
-    with open("results_compression_test_python.json", "w") as f:
-        json.dump(result, f, indent=4)
-    print(json.dumps(result, indent=4))
+    main(CompressionTestTest, __file__)
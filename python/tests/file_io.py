@@ -1,65 +1,353 @@
+import asyncio
+import mmap
 import os
+import random
 import time
-import json
 import tempfile
-import gc
+from concurrent.futures import ThreadPoolExecutor
 
-class FileIoTest:
-    def __init__(self, size_mb=50, name="FileIOTest"):
+from bench_core import Benchmark, Skip, main, percentile
+
+MB = 1024 * 1024
+BLOCK_SIZES = (4096, 64 * 1024, MB)
+STRATEGIES = (
+    "buffered", "readinto", "mmap_seq", "mmap_random", "pread", "pwrite",
+    "sendfile", "copy_file_range", "fsync", "fdatasync", "o_direct",
+)
+# random reads spread over a pool of concurrent readers
+RANDOM_BLOCK_SIZES = (4096, 64 * 1024)
+READER_COUNTS = (1, 4, 16, 64)
+CONCURRENT = ("threaded_readers", "asyncio_readers")
+# strategies that time reads of a file prepared in setup()
+READ_ONLY = {"readinto", "mmap_seq", "mmap_random", "pread", "random_pread",
+             "sendfile", "copy_file_range"} | set(CONCURRENT)
+# durable writes are slow on real disks; they move sync_mb instead of size_mb
+SYNCED = {"fsync", "fdatasync"}
+# strategies that write the file and then read it back in the same call
+ROUND_TRIP = {"buffered", "o_direct"}
+
+
+class FileIoTest(Benchmark):
+    default_runs = 3
+
+    def __init__(self, size_mb=50, name="FileIOTest", strategy="buffered", block_size=MB,
+                 strategies=STRATEGIES, block_sizes=BLOCK_SIZES, sync_mb=8, directory=None,
+                 readers=1, random_block_sizes=RANDOM_BLOCK_SIZES, reader_counts=READER_COUNTS):
+        super().__init__()
         self.name = name
         self.size_mb = size_mb
-        self.test_file = os.path.join(tempfile.gettempdir(), "41e0a8c7d0.cgv")
+        self.strategy = strategy
+        self.block_size = block_size
+        self.strategies = strategies
+        self.block_sizes = block_sizes
+        self.sync_mb = sync_mb
+        self.directory = directory or tempfile.gettempdir()
+        self.readers = readers
+        self.random_block_sizes = random_block_sizes
+        self.reader_counts = reader_counts
 
-    def run_once(self):
-        data = ("X" * 1024 * 1024).encode("utf-8")  # 1 MB block
+    @property
+    def file_mb(self):
+        return self.sync_mb if self.strategy in SYNCED else self.size_mb
 
-        # Write test
-        t0 = time.perf_counter()
+    @property
+    def ops_per_call(self):
+        # one op per MB moved, so ops_per_sec reads as MB/s; a round trip moves the file twice
+        return self.file_mb * (2 if self.strategy in ROUND_TRIP else 1)
+
+    @property
+    def blocks(self):
+        return self.file_mb * MB // self.block_size
+
+    def params(self):
+        p = {"strategy": self.strategy, "block_size": self.block_size,
+             "size_mb": self.file_mb, "directory": self.directory}
+        if self.strategy in CONCURRENT:
+            p["readers"] = self.readers
+        return p
+
+    def variants(self):
+        out = [{"strategy": s, "block_size": b} for s in self.strategies for b in self.block_sizes]
+        out += [{"strategy": "random_pread", "block_size": b} for b in self.random_block_sizes]
+        out += [{"strategy": s, "block_size": b, "readers": n}
+                for s in CONCURRENT for b in self.random_block_sizes for n in self.reader_counts]
+        return out
+
+    def setup(self):
+        needs = {
+            "sendfile": "sendfile", "copy_file_range": "copy_file_range",
+            "fdatasync": "fdatasync", "o_direct": "O_DIRECT", "pread": "pread", "pwrite": "pwrite",
+            "random_pread": "pread", "threaded_readers": "pread", "asyncio_readers": "pread",
+        }.get(self.strategy)
+        if needs and not hasattr(os, needs):
+            raise Skip(f"os.{needs} is not available on this platform")
+
+        # unique per run, so concurrent runs never clobber each other's files
+        fd, self.test_file = tempfile.mkstemp(prefix="file_io_", suffix=".cgv", dir=self.directory)
+        os.close(fd)
+        self.copy_file = self.test_file + ".copy"
+        self.fd = None
+        self.pool = None
+        self.loop = None
+
+        self.data = b"X" * self.block_size
+        self.buf = bytearray(self.block_size)
+        rng = random.Random(0)
+        self.offsets = [rng.randrange(self.blocks) * self.block_size for _ in range(self.blocks)]
+        if self.strategy in READ_ONLY:
+            with open(self.test_file, "wb") as f:
+                for _ in range(self.blocks):
+                    f.write(self.data)
+        if self.strategy in CONCURRENT:
+            self.fd = os.open(self.test_file, os.O_RDONLY)
+            self.pool = ThreadPoolExecutor(max_workers=self.readers)
+            # one slice of the random offsets per reader
+            self.shares = [self.offsets[i::self.readers] for i in range(self.readers)]
+        if self.strategy == "asyncio_readers":
+            self.loop = asyncio.new_event_loop()
+        if self.strategy == "o_direct":
+            # O_DIRECT needs page-aligned buffers; anonymous mmaps are
+            self.aligned = mmap.mmap(-1, self.block_size)
+            self.aligned.write(self.data)
+            try:
+                fd = os.open(self.test_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_DIRECT)
+            except OSError as e:
+                os.remove(self.test_file)
+                raise Skip(f"O_DIRECT not supported in {self.directory}: {e}")
+            os.close(fd)
+
+    def teardown(self):
+        if self.loop is not None:
+            self.loop.close()
+        if self.pool is not None:
+            self.pool.shutdown()
+        if self.fd is not None:
+            os.close(self.fd)
+        for path in (self.test_file, self.copy_file):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def workload(self):
+        lat = self.counters.setdefault("latencies", [])
+        getattr(self, "_" + self.strategy)(lat)
+
+    def _phase(self, name, seconds):
+        key = name + "_time_s"
+        self.counters[key] = self.counters.get(key, 0.0) + seconds
+
+    def _buffered(self, lat):
+        data, clock = self.data, time.perf_counter
+        t0 = clock()
         with open(self.test_file, "wb") as f:
-            for _ in range(self.size_mb):
+            for _ in range(self.blocks):
+                t = clock()
                 f.write(data)
-        write_time = time.perf_counter() - t0
-
-        # Read test
-        t1 = time.perf_counter()
+                lat.append(clock() - t)
+        t1 = clock()
         with open(self.test_file, "rb") as f:
-            while f.read(1024 * 1024):
-                pass
-        read_time = time.perf_counter() - t1
+            while True:
+                t = clock()
+                chunk = f.read(self.block_size)
+                lat.append(clock() - t)
+                if not chunk:
+                    break
+        t2 = clock()
+        self._phase("write", t1 - t0)
+        self._phase("read", t2 - t1)
+
+    def _readinto(self, lat):
+        view, clock = memoryview(self.buf), time.perf_counter
+        t0 = clock()
+        with open(self.test_file, "rb", buffering=0) as f:
+            while True:
+                t = clock()
+                n = f.readinto(view)
+                lat.append(clock() - t)
+                if not n:
+                    break
+        self._phase("read", clock() - t0)
+
+    def _mmap_read(self, lat, offsets):
+        buf, bs, clock = self.buf, self.block_size, time.perf_counter
+        t0 = clock()
+        with open(self.test_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            for off in offsets:
+                t = clock()
+                buf[:] = view[off:off + bs]
+                lat.append(clock() - t)
+            view.release()
+        self._phase("read", clock() - t0)
+
+    def _mmap_seq(self, lat):
+        self._mmap_read(lat, range(0, self.blocks * self.block_size, self.block_size))
+
+    def _mmap_random(self, lat):
+        self._mmap_read(lat, self.offsets)
+
+    def _pread(self, lat):
+        bs, clock = self.block_size, time.perf_counter
+        fd = os.open(self.test_file, os.O_RDONLY)
+        t0 = clock()
+        try:
+            for i in range(self.blocks):
+                t = clock()
+                os.pread(fd, bs, i * bs)
+                lat.append(clock() - t)
+        finally:
+            os.close(fd)
+        self._phase("read", clock() - t0)
+
+    def _random_pread(self, lat):
+        bs, clock = self.block_size, time.perf_counter
+        fd = os.open(self.test_file, os.O_RDONLY)
+        t0 = clock()
+        try:
+            for off in self.offsets:
+                t = clock()
+                os.pread(fd, bs, off)
+                lat.append(clock() - t)
+        finally:
+            os.close(fd)
+        self._phase("read", clock() - t0)
+
+    def _timed_pread(self, off):
+        t = time.perf_counter()
+        os.pread(self.fd, self.block_size, off)
+        return time.perf_counter() - t
+
+    def _read_share(self, offsets):
+        return [self._timed_pread(off) for off in offsets]
+
+    def _threaded_readers(self, lat):
+        t0 = time.perf_counter()
+        for share in self.pool.map(self._read_share, self.shares):
+            lat.extend(share)
+        self._phase("read", time.perf_counter() - t0)
+
+    async def _gather_reads(self):
+        run = self.loop.run_in_executor
+        return await asyncio.gather(*(run(self.pool, self._timed_pread, off) for off in self.offsets))
+
+    def _asyncio_readers(self, lat):
+        t0 = time.perf_counter()
+        lat.extend(self.loop.run_until_complete(self._gather_reads()))
+        self._phase("read", time.perf_counter() - t0)
+
+    def _pwrite(self, lat):
+        data, bs, clock = self.data, self.block_size, time.perf_counter
+        fd = os.open(self.test_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        t0 = clock()
+        try:
+            for i in range(self.blocks):
+                t = clock()
+                os.pwrite(fd, data, i * bs)
+                lat.append(clock() - t)
+        finally:
+            os.close(fd)
+        self._phase("write", clock() - t0)
 
+    def _copy(self, lat, copy_block):
+        bs, total, clock = self.block_size, self.blocks * self.block_size, time.perf_counter
+        src = os.open(self.test_file, os.O_RDONLY)
+        dst = os.open(self.copy_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        t0 = clock()
         try:
-            os.remove(self.test_file)
-        except OSError:
-            pass
-
-        return {
-            "write_time_s": write_time,
-            "read_time_s": read_time,
-            "write_MBps": self.size_mb / write_time if write_time > 0 else 0,
-            "read_MBps": self.size_mb / read_time if read_time > 0 else 0
-        }
-
-    def run(self, runs=None, iterations=None):
-        if runs is None:
-            runs = 3
-        results = []
-        for _ in range(runs):
-            results.append(self.run_once())
-            gc.collect()
-
-        avg_write = sum(r["write_MBps"] for r in results) / runs
-        avg_read = sum(r["read_MBps"] for r in results) / runs
-
-        return {
-            "name": self.name,
-            "runs": runs,
-            "avg_write_MBps": avg_write,
-            "avg_read_MBps": avg_read,
-            "raw": results
-        }
+            off = 0
+            while off < total:
+                t = clock()
+                n = copy_block(src, dst, off, min(bs, total - off))
+                lat.append(clock() - t)
+                if n <= 0:
+                    break
+                off += n
+        finally:
+            os.close(src)
+            os.close(dst)
+        self._phase("copy", clock() - t0)
+
+    def _sendfile(self, lat):
+        self._copy(lat, lambda src, dst, off, count: os.sendfile(dst, src, off, count))
+
+    def _copy_file_range(self, lat):
+        self._copy(lat, lambda src, dst, off, count: os.copy_file_range(src, dst, count, off, off))
+
+    def _synced_write(self, lat, sync):
+        data, clock = self.data, time.perf_counter
+        fd = os.open(self.test_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        t0 = clock()
+        try:
+            for _ in range(self.blocks):
+                t = clock()
+                os.write(fd, data)
+                sync(fd)
+                lat.append(clock() - t)
+        finally:
+            os.close(fd)
+        self._phase("write", clock() - t0)
+
+    def _fsync(self, lat):
+        self._synced_write(lat, os.fsync)
+
+    def _fdatasync(self, lat):
+        self._synced_write(lat, os.fdatasync)
+
+    def _o_direct(self, lat):
+        bs, clock, buf = self.block_size, time.perf_counter, self.aligned
+        t0 = clock()
+        fd = os.open(self.test_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_DIRECT)
+        try:
+            for i in range(self.blocks):
+                t = clock()
+                os.pwrite(fd, buf, i * bs)
+                lat.append(clock() - t)
+        finally:
+            os.close(fd)
+        t1 = clock()
+        fd = os.open(self.test_file, os.O_RDONLY | os.O_DIRECT)
+        try:
+            for i in range(self.blocks):
+                t = clock()
+                os.preadv(fd, [buf], i * bs)
+                lat.append(clock() - t)
+        finally:
+            os.close(fd)
+        t2 = clock()
+        self._phase("write", t1 - t0)
+        self._phase("read", t2 - t1)
+
+    def sample_metrics(self, reps, elapsed):
+        mb = self.file_mb * reps
+        metrics = {}
+        for phase in ("write", "read", "copy"):
+            seconds = self.counters.get(phase + "_time_s")
+            if seconds is not None:
+                metrics[phase + "_time_s"] = seconds
+                metrics[phase + "_MBps"] = mb / seconds if seconds > 0 else 0
+        lat = sorted(self.counters.get("latencies", ()))
+        if lat:
+            metrics["iops"] = len(lat) / elapsed if elapsed > 0 else 0
+            metrics["block_p50_s"] = percentile(lat, 50)
+            metrics["block_p90_s"] = percentile(lat, 90)
+            metrics["block_p99_s"] = percentile(lat, 99)
+        return metrics
+
+    def compare_variants(self, primary, variant_results):
+        table = {}
+        for r in variant_results:
+            v = r["variant"]
+            key = str(v["block_size"])
+            if "readers" in v:
+                key += f"x{v['readers']}"
+            table.setdefault(v["strategy"], {})[key] = {
+                "MBps": r["median_ops_per_sec"],
+                "iops": r.get("median_iops"),
+                "block_p50_s": r.get("median_block_p50_s"),
+                "block_p99_s": r.get("median_block_p99_s"),
+            }
+        return {"strategies": table}
 
 if __name__ == "__main__":
-    res = FileIoTest().run()
-    with open("results_file_io_test_python.json", "w") as f:
-        json.dump(res, f, indent=2)
-    print(f"{res['name']}: Write={res['avg_write_MBps']:.2f} MB/s | Read={res['avg_read_MBps']:.2f} MB/s")
+    main(FileIoTest, __file__)
@@ -1,79 +1,59 @@
 import json
 import time
-import random
-import gc
-import os
 
-class JsonSerializationTestTest:
-    def __init__(self, obj_size=50, depth=3, runs=5, name="JSON Serialization"):
+from bench_core import Benchmark, main
+from bench_fixtures import fixture
+
+class JsonSerializationTestTest(Benchmark):
+    def __init__(self, obj_size=50, depth=3, runs=5, name="JSON Serialization", seed=0):
+        super().__init__(runs=runs)
         self.name = name
         self.obj_size = obj_size
         self.depth = depth
-        self.runs = runs
+        self.seed = seed
+        self.encoded_len = 1
+
+    @property
+    def ops_per_call(self):
+        # throughput is reported in encoded bytes per second
+        return self.encoded_len
+
+    def params(self):
+        return {"obj_size": self.obj_size, "depth": self.depth, "seed": self.seed}
 
-    def _generate_nested(self, level):
+    @staticmethod
+    def _generate_nested(rng, level, obj_size):
         if level == 0:
             return {
-                "id": random.randint(1, 1_000_000),
-                "value": random.random(),
-                "active": random.choice([True, False]),
+                "id": rng.randint(1, 1_000_000),
+                "value": rng.random(),
+                "active": rng.choice([True, False]),
                 "text": "x" * 50
             }
         else:
             return {
-                f"child_{i}": self._generate_nested(level - 1)
-                for i in range(self.obj_size // 10)
+                f"child_{i}": JsonSerializationTestTest._generate_nested(rng, level - 1, obj_size)
+                for i in range(obj_size // 10)
             }
 
-    def run_once(self):
+    @staticmethod
+    def nested_trees(rng, count, depth, obj_size):
+        return [JsonSerializationTestTest._generate_nested(rng, depth, obj_size) for _ in range(count)]
+
+    def setup(self):
         # Generate nested JSON data
-        data = [self._generate_nested(self.depth) for _ in range(20)]
+        self.data = fixture("nested_trees", self.nested_trees, 20, self.depth, self.obj_size, seed=self.seed)
+        self.encoded_len = len(json.dumps(self.data))
 
-        # Measure encode/decode performance
+    def workload(self):
         t0 = time.perf_counter()
-        s = json.dumps(data)
+        s = json.dumps(self.data)
         mid = time.perf_counter()
-        _ = json.loads(s)
+        json.loads(s)
         t1 = time.perf_counter()
 
-        encode_t = mid - t0
-        decode_t = t1 - mid
-        total = t1 - t0
-        ops = len(s) / total if total > 0 else 0
-
-        return {
-            "encode_s": encode_t,
-            "decode_s": decode_t,
-            "total_s": total,
-            "ops_per_s": ops
-        }
-
-    def run(self, runs=None, iterations=None):
-        # `iterations` unused but included for benchmark uniformity
-        if runs is None:
-            runs = self.runs
-
-        results = []
-        for _ in range(runs):
-            results.append(self.run_once())
-            gc.collect()
-
-        totals = sorted(r["total_s"] for r in results)
-        ops = sorted(r["ops_per_s"] for r in results)
-        median_t = totals[len(totals)//2]
-        median_ops = ops[len(ops)//2]
-
-        return {
-            "name": self.name,
-            "runs": runs,
-            "median_total_s": median_t,
-            "median_ops_per_s": median_ops,
-            "raw": results
-        }
+        self.counters["encode_s"] = self.counters.get("encode_s", 0.0) + (mid - t0)
+        self.counters["decode_s"] = self.counters.get("decode_s", 0.0) + (t1 - mid)
 
 if __name__ == "__main__":
-    result = JsonSerializationTestTest().run()
-    with open("results_json_serialization_python.json", "w") as f:
-        json.dump(result, f, indent=2)
-    print(f"{result['name']}: Median Time={result['median_total_s']:.4f}s | "
-          f"Ops/sec={result['median_ops_per_s']:.2f}")
+    main(JsonSerializationTestTest, __file__)
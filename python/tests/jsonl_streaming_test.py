@@ -0,0 +1,225 @@
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from queue import Empty
+
+from bench_core import Benchmark, main, max_rss_bytes
+
+MB = 1024 * 1024
+SIZES_MB = (10, 100)
+WRITERS = ("batched", "per_record")
+READERS = ("raw_decode", "lines")
+
+
+def record_pool(count=1000, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            "id": i,
+            "ts": 1_700_000_000 + rng.randrange(86_400),
+            "user": f"user_{rng.randrange(100_000)}",
+            "event": rng.choice(("click", "view", "purchase", "login", "logout")),
+            "value": round(rng.random() * 1000, 3),
+            "tags": [f"t{rng.randrange(50)}" for _ in range(rng.randrange(1, 5))],
+            "meta": {"ip": f"10.0.{rng.randrange(256)}.{rng.randrange(256)}", "ok": rng.random() > 0.1},
+        }
+        for i in range(count)
+    ]
+
+
+def write_batched(f, records, batch_size=1000):
+    encode = json.JSONEncoder(separators=(",", ":")).encode
+    batch = []
+    for rec in records:
+        batch.append(encode(rec))
+        if len(batch) >= batch_size:
+            f.write("\n".join(batch))
+            f.write("\n")
+            batch.clear()
+    if batch:
+        f.write("\n".join(batch))
+        f.write("\n")
+
+
+def write_per_record(f, records):
+    for rec in records:
+        f.write(json.dumps(rec) + "\n")
+
+
+def read_raw_decode(f, buffer_size=MB):
+    """Yield records from a rolling text buffer with one reused JSONDecoder."""
+    raw_decode = json.JSONDecoder().raw_decode
+    buf, pos = "", 0
+    while True:
+        chunk = f.read(buffer_size)
+        buf = buf[pos:] + chunk
+        pos, end_of_buf = 0, len(buf)
+        while pos < end_of_buf:
+            if buf[pos] == "\n":
+                pos += 1
+                continue
+            try:
+                obj, pos = raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break  # record continues in the next chunk
+            yield obj
+        if not chunk:
+            return
+
+
+def read_lines(f):
+    loads = json.loads
+    for line in f:
+        yield loads(line)
+
+
+def _rss_probe(kwargs, queue):
+    try:
+        bench = JsonlStreamingTestTest(**kwargs)
+        bench.setup()
+        try:
+            start = max_rss_bytes()
+            bench.workload()
+            queue.put((start, max_rss_bytes()))
+        finally:
+            bench.teardown()
+    except Exception as e:
+        # the parent re-raises this; without it the parent would wait forever
+        queue.put(f"{type(e).__name__}: {e}")
+
+
+def _probe_reply(proc, queue, poll=1.0):
+    """The probe's (start, end) RSS or its error text, without hanging on a dead child."""
+    while True:
+        try:
+            return queue.get(timeout=poll)
+        except Empty:
+            if not proc.is_alive():
+                try:
+                    return queue.get_nowait()
+                except Empty:
+                    return f"probe process exited with code {proc.exitcode}"
+
+
+class JsonlStreamingTestTest(Benchmark):
+    name = "JSONL Streaming"
+    default_runs = 3
+
+    def __init__(self, size_mb=10, writer="batched", reader="raw_decode", batch_size=1000,
+                 buffer_size=MB, sizes_mb=SIZES_MB, directory=None, measure_rss=True):
+        super().__init__()
+        self.size_mb = size_mb
+        self.writer = writer
+        self.reader = reader
+        self.batch_size = batch_size
+        self.buffer_size = buffer_size
+        self.sizes_mb = sizes_mb
+        self.directory = directory or tempfile.gettempdir()
+        self.measure_rss = measure_rss
+        self.pool = record_pool()
+        avg = sum(len(json.dumps(r, separators=(",", ":"))) + 1 for r in self.pool) / len(self.pool)
+        self.avg_record_bytes = avg
+
+    @property
+    def records(self):
+        return max(1, int(self.size_mb * MB / self.avg_record_bytes))
+
+    @property
+    def ops_per_call(self):
+        # one op per record written and read back
+        return self.records
+
+    def params(self):
+        return {"size_mb": self.size_mb, "records": self.records, "writer": self.writer,
+                "reader": self.reader, "batch_size": self.batch_size, "buffer_size": self.buffer_size}
+
+    def variants(self):
+        out = [{"size_mb": s} for s in self.sizes_mb]
+        smallest = min(self.sizes_mb)
+        out += [{"size_mb": smallest, "writer": w} for w in WRITERS if w != self.writer]
+        out += [{"size_mb": smallest, "reader": r} for r in READERS if r != self.reader]
+        return out
+
+    def _kwargs(self):
+        return {"size_mb": self.size_mb, "writer": self.writer, "reader": self.reader,
+                "batch_size": self.batch_size, "buffer_size": self.buffer_size,
+                "directory": self.directory, "measure_rss": False}
+
+    def setup(self):
+        fd, self.path = tempfile.mkstemp(prefix="jsonl_", suffix=".jsonl", dir=self.directory)
+        os.close(fd)
+        self.rss = None
+        if self.measure_rss and max_rss_bytes() is not None:
+            # a fresh interpreter per configuration, since ru_maxrss only ever grows
+            ctx = multiprocessing.get_context("spawn")
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_rss_probe, args=(self._kwargs(), queue))
+            proc.start()
+            reply = _probe_reply(proc, queue)
+            proc.join()
+            if isinstance(reply, str):
+                self.teardown()
+                raise RuntimeError(f"RSS probe failed: {reply}")
+            self.rss = reply
+
+    def teardown(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def workload(self):
+        records = itertools.islice(itertools.cycle(self.pool), self.records)
+        clock = time.perf_counter
+        t0 = clock()
+        with open(self.path, "w") as f:
+            if self.writer == "batched":
+                write_batched(f, records, self.batch_size)
+            else:
+                write_per_record(f, records)
+        t1 = clock()
+        count = 0
+        with open(self.path, "r") as f:
+            stream = read_raw_decode(f, self.buffer_size) if self.reader == "raw_decode" else read_lines(f)
+            for _ in stream:
+                count += 1
+        t2 = clock()
+        if count != self.records:
+            raise ValueError(f"read {count} records, wrote {self.records}")
+        self.counters["write_s"] = self.counters.get("write_s", 0.0) + (t1 - t0)
+        self.counters["read_s"] = self.counters.get("read_s", 0.0) + (t2 - t1)
+
+    def sample_metrics(self, reps, elapsed):
+        n = self.records * reps
+        write_s, read_s = self.counters["write_s"], self.counters["read_s"]
+        metrics = {
+            "write_s": write_s,
+            "read_s": read_s,
+            "write_records_per_sec": n / write_s if write_s > 0 else 0,
+            "read_records_per_sec": n / read_s if read_s > 0 else 0,
+        }
+        if self.rss:
+            start, peak = self.rss
+            metrics["peak_rss_bytes"] = peak
+            metrics["rss_growth_bytes"] = peak - start
+        return metrics
+
+    def compare_variants(self, primary, variant_results):
+        by_size = {}
+        for r in variant_results:
+            if set(r["variant"]) == {"size_mb"} and "median_peak_rss_bytes" in r:
+                by_size[r["variant"]["size_mb"]] = {
+                    "peak_rss_bytes": r["median_peak_rss_bytes"],
+                    "rss_growth_bytes": r["median_rss_growth_bytes"],
+                    "records_per_sec": r["median_ops_per_sec"],
+                }
+        return {"rss_by_size_mb": by_size}
+
+if __name__ == "__main__":
+    main(JsonlStreamingTestTest, __file__)
@@ -1,15 +1,157 @@
-import time
+import bisect
+import heapq
 import random
-import json
-import gc
-import os
-
-class ListOpsTest:
-    def __init__(self, ops_per_iter=1_000_000, name="ListOps"):
+from collections import deque
+
+from bench_core import Benchmark, main
+from bench_fixtures import fixture, random_ints
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+CONTAINERS = ("list", "deque", "sorted_list", "heapq", "blocked_list")
+# deque.insert/del rotate through the middle: roughly 10x list's memmove at the same n
+LINEAR = {"deque"}
+
+
+class BlockedList:
+    """Positional sequence stored as a list of blocks, each holding between 1 and
+    2 * load items. A Fenwick tree over the block lengths maps a position to its
+    block in O(log blocks), so insert/delete cost O(log n + load) instead of O(n)."""
+    __slots__ = ("load", "blocks", "tree", "size")
+
+    def __init__(self, iterable=(), load=1000):
+        values = list(iterable)
+        self.load = load
+        self.blocks = [values[i:i + load] for i in range(0, len(values), load)] or [[]]
+        self.size = len(values)
+        self._rebuild()
+
+    def _rebuild(self):
+        tree = [0] + [len(b) for b in self.blocks]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def _locate(self, idx):
+        """Block number and offset of position idx; idx == len(self) lands after the last item."""
+        if idx >= self.size:
+            return len(self.blocks) - 1, len(self.blocks[-1]) + idx - self.size
+        tree = self.tree
+        pos, step = 0, 1 << (len(tree).bit_length() - 1)
+        while step:
+            nxt = pos + step
+            if nxt < len(tree) and tree[nxt] <= idx:
+                idx -= tree[nxt]
+                pos = nxt
+            step >>= 1
+        return pos, idx
+
+    def _index(self, idx):
+        if idx < 0:
+            idx += self.size
+        if not 0 <= idx < self.size:
+            raise IndexError("BlockedList index out of range")
+        return idx
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for block in self.blocks:
+            yield from block
+
+    def __getitem__(self, idx):
+        k, off = self._locate(self._index(idx))
+        return self.blocks[k][off]
+
+    def __delitem__(self, idx):
+        k, off = self._locate(self._index(idx))
+        block = self.blocks[k]
+        del block[off]
+        self.size -= 1
+        if not block and len(self.blocks) > 1:
+            del self.blocks[k]
+            self._rebuild()
+        else:
+            i, tree = k + 1, self.tree
+            while i < len(tree):
+                tree[i] -= 1
+                i += i & -i
+
+    def insert(self, idx, value):
+        # clamp like list.insert
+        if idx < 0:
+            idx = max(idx + self.size, 0)
+        k, off = self._locate(min(idx, self.size))
+        block = self.blocks[k]
+        block.insert(off, value)
+        self.size += 1
+        if len(block) > 2 * self.load:
+            self.blocks[k:k + 1] = [block[:self.load], block[self.load:]]
+            self._rebuild()
+        else:
+            i, tree = k + 1, self.tree
+            while i < len(tree):
+                tree[i] += 1
+                i += i & -i
+
+    def append(self, value):
+        self.insert(self.size, value)
+
+
+class ListOpsTest(Benchmark):
+    def __init__(self, ops_per_iter=None, name="ListOps", container=None, n=100_000, mix_ops=1000,
+                 sizes=SIZES, containers=CONTAINERS, linear_max=1_000_000, seed=0):
+        super().__init__(ops_per_iter)
         self.name = name
-        self.ops_per_iter = ops_per_iter
-
-    def workload(self):
+        self.container = container
+        self.n = n
+        self.mix_ops = mix_ops
+        self.sizes = sizes
+        self.containers = containers
+        self.linear_max = linear_max
+        self.seed = seed
+
+    @property
+    def ops_per_call(self):
+        # the original mix counts 1000 per call; variants count every insert, delete and access
+        return 1000 if self.container is None else self.mix_ops
+
+    def params(self):
+        if self.container is None:
+            return {"container": "list", "n": 5000}
+        return {"container": self.container, "n": self.n, "mix_ops": self.mix_ops}
+
+    def variants(self):
+        return [{"container": c, "n": n} for c in self.containers for n in self.sizes
+                if c not in LINEAR or n <= self.linear_max]
+
+    def setup(self):
+        if self.container is None:
+            return
+        n, quarter = self.n, self.mix_ops // 4
+        # indices below n stay valid while the size moves between n and n + quarter
+        self.positions = fixture("random_ints", random_ints, 2 * self.mix_ops, 0, n - 1, seed=self.seed)
+        self.values = fixture("random_ints", random_ints, quarter, 0, 2 * n, seed=self.seed + 1)
+        self.quarter = quarter
+        if self.container == "list":
+            self.seq = list(range(n))
+        elif self.container == "deque":
+            self.seq = deque(range(n))
+        elif self.container == "sorted_list":
+            self.seq = list(range(0, 2 * n, 2))
+        elif self.container == "heapq":
+            self.seq = list(range(0, 2 * n, 2))
+        elif self.container == "blocked_list":
+            self.seq = BlockedList(range(n))
+        else:
+            raise ValueError(f"unknown container {self.container!r}")
+
+    def teardown(self):
+        self.seq = None
+
+    def original(self):
         lst = []
 
         # Append phase
@@ -34,52 +176,60 @@ class ListOpsTest:
 
         return s
 
-    def run_once(self, iterations):
-        reps = max(1, iterations // 1000, 50)
-        t0 = time.perf_counter()
-        total = 0
-
-        for _ in range(reps):
-            total += self.workload()
-
-        t1 = time.perf_counter()
-        duration = t1 - t0
-        ops_done = reps * 1000
-
-        return {
-            "time_s": duration,
-            "ops": ops_done,
-            "ops_per_sec": ops_done / (duration if duration > 0 else 1e-9),
-            "acc": total,
-            "gc_stat_after": gc.get_stats()[-1] if hasattr(gc, "get_stats") else None
-        }
-
-    def run(self, runs=None, iterations=None):
-        iterations = iterations or self.ops_per_iter
-        runs = runs or 5
-        results = []
-
-        for _ in range(runs):
-            results.append(self.run_once(iterations))
-            gc.collect()
-
-        times = sorted(r["time_s"] for r in results)
-        ops = sorted(r["ops_per_sec"] for r in results)
-        median_time = times[len(times)//2]
-        median_ops = ops[len(ops)//2]
-
-        return {
-            "name": self.name,
-            "runs": runs,
-            "median_time_s": median_time,
-            "median_ops_per_sec": median_ops,
-            "raw": results
-        }
+    def workload(self):
+        if self.container is None:
+            return self.original()
+        # a quarter inserts, a quarter deletes, half random reads; the size ends where it started
+        seq, q = self.seq, self.quarter
+        inserts = zip(self.positions[:q], self.values)
+        deletes = self.positions[q:2 * q]
+        reads = self.positions[2 * q:self.mix_ops]
+        s = 0
+        if self.container == "sorted_list":
+            insort = bisect.insort
+            for _, v in inserts:
+                insort(seq, v)
+            for idx in deletes:
+                del seq[idx]
+            for idx in reads:
+                s += seq[idx]
+        elif self.container == "heapq":
+            # a heap has no positions: push, pop the minimum, peek the minimum
+            push, pop = heapq.heappush, heapq.heappop
+            for _, v in inserts:
+                push(seq, v)
+            for _ in deletes:
+                pop(seq)
+            for _ in reads:
+                s += seq[0]
+        else:
+            insert = seq.insert
+            for idx, v in inserts:
+                insert(idx, v)
+            for idx in deletes:
+                del seq[idx]
+            for idx in reads:
+                s += seq[idx]
+        return s
+
+    def compare_variants(self, primary, variant_results):
+        ops = {}
+        for r in variant_results:
+            v = r["variant"]
+            ops.setdefault(v["container"], {})[v["n"]] = r["median_ops_per_sec"]
+        # smallest n from which blocked_list stays ahead of each positional container
+        crossover = {}
+        blocked = ops.get("blocked_list", {})
+        for container in ("list", "deque"):
+            curve = ops.get(container)
+            if curve is None:
+                continue
+            crossover[container] = None
+            for n in sorted(curve, reverse=True):
+                if n not in blocked or blocked[n] <= curve[n]:
+                    break
+                crossover[container] = n
+        return {"ops_per_sec": ops, "blocked_list_wins_from_n": crossover}
 
 if __name__ == "__main__":
-    test = ListOpsTest()
-    result = test.run()
-    with open("results_python_list_ops.json", "w") as f:
-        json.dump(result, f, indent=2)
-    print(f"{result['name']}: Median Time={result['median_time_s']:.4f}s | "
-          f"Ops/sec={result['median_ops_per_sec']:.2f}")
+    main(ListOpsTest, __file__)
@@ -1,57 +1,154 @@
-import time, json, gc
+import sys
 
-class LogicControlTest:
-    def __init__(self, ops_per_iter=10_000_000):
+from bench_core import Benchmark, Skip, main
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SIZES = (10, 100, 1_000, 10_000, 100_000, 1_000_000, 4_000_000)
+STRATEGIES = ("if_elif", "match", "dict_dispatch", "lookup_table", "numpy_select", "numpy_table")
+VECTORIZED = ("numpy_select", "numpy_table")
+
+
+def _fizzbuzz(i):
+    return i * 2
+
+
+def _buzz(i):
+    return -i
+
+
+def _fizz(i):
+    return i // 2
+
+
+def _other(i):
+    return i & 1
+
+
+# i % 15 -> handler; residues not listed fall through to _other
+DISPATCH = {0: _fizzbuzz, 5: _buzz, 10: _buzz, 3: _fizz, 6: _fizz, 9: _fizz, 12: _fizz}
+# i % 15 -> (coefficient of i, of i // 2, of i & 1): the same rules as branch-free arithmetic
+COEFFICIENTS = tuple(
+    (2, 0, 0) if r == 0 else (-1, 0, 0) if r % 5 == 0 else (0, 1, 0) if r % 3 == 0 else (0, 0, 1)
+    for r in range(15)
+)
+
+
+def classify_if_elif(n):
+    acc = 0
+    for i in range(1, n + 1):
+        if i % 15 == 0:
+            acc += i * 2
+        elif i % 5 == 0:
+            acc -= i
+        elif i % 3 == 0:
+            acc += i // 2
+        else:
+            acc += (i & 1)
+    return acc
+
+
+if sys.version_info >= (3, 10):
+    from bench_match import classify_match
+else:
+    classify_match = None
+
+
+def classify_dict_dispatch(n):
+    acc = 0
+    get = DISPATCH.get
+    for i in range(1, n + 1):
+        acc += get(i % 15, _other)(i)
+    return acc
+
+
+def classify_lookup_table(n):
+    acc = 0
+    table = COEFFICIENTS
+    for i in range(1, n + 1):
+        a, b, c = table[i % 15]
+        acc += a * i + b * (i // 2) + c * (i & 1)
+    return acc
+
+
+def classify_numpy_select(n):
+    i = numpy.arange(1, n + 1, dtype=numpy.int64)
+    r = i % 15
+    return int(numpy.select([r == 0, r % 5 == 0, r % 3 == 0], [i * 2, -i, i // 2], default=i & 1).sum())
+
+
+def classify_numpy_table(n):
+    i = numpy.arange(1, n + 1, dtype=numpy.int64)
+    coef = numpy.array(COEFFICIENTS, dtype=numpy.int64)[i % 15]
+    return int((coef[:, 0] * i + coef[:, 1] * (i // 2) + coef[:, 2] * (i & 1)).sum())
+
+
+CLASSIFIERS = {
+    "if_elif": classify_if_elif,
+    "match": classify_match,
+    "dict_dispatch": classify_dict_dispatch,
+    "lookup_table": classify_lookup_table,
+    "numpy_select": classify_numpy_select,
+    "numpy_table": classify_numpy_table,
+}
+
+
+class LogicControlTest(Benchmark):
+    def __init__(self, ops_per_iter=None, n=499, strategy="if_elif", sizes=SIZES, strategies=STRATEGIES,
+                 legacy_ops=1000):
+        super().__init__(ops_per_iter)
         self.name = "LogicControl"
-        self.ops_per_iter = ops_per_iter
+        self.n = n
+        self.strategy = strategy
+        self.sizes = sizes
+        self.strategies = strategies
+        # ops credited per call instead of n: the original unit (1000 per 1..499 pass)
+        # that runner.c compares against Ruby; every variant clears it
+        self.legacy_ops = legacy_ops
+
+    @property
+    def ops_per_call(self):
+        return self.legacy_ops or self.n
+
+    def params(self):
+        return {"n": self.n, "strategy": self.strategy}
+
+    def variants(self):
+        return [{"strategy": s, "n": n, "legacy_ops": None} for s in self.strategies for n in self.sizes]
+
+    def setup(self):
+        if self.strategy in VECTORIZED and numpy is None:
+            raise Skip("numpy is not installed")
+        self.classify = CLASSIFIERS[self.strategy]
+        if self.classify is None:
+            raise Skip("match statements need Python 3.10+")
 
     def workload(self):
-        acc = 0
-        for i in range(1, 500):
-            if i % 15 == 0:
-                acc += i * 2
-            elif i % 5 == 0:
-                acc -= i
-            elif i % 3 == 0:
-                acc += i // 2
-            else:
-                acc += (i & 1)
-        return acc
-
-    def run_once(self, iterations):
-        reps = max(1, iterations // 1000)
-        t0 = time.perf_counter()
-        acc = 0
-        for _ in range(reps):
-            acc += self.workload()
-        t1 = time.perf_counter()
-        duration = t1 - t0
-        ops_done = reps * 1000
-        return {
-            "time_s": duration,
-            "ops": ops_done,
-            "ops_per_sec": ops_done / (duration if duration > 0 else 1e-9),
-            "acc": acc,
-            "gc_stat_after": gc.get_stats()[-1] if hasattr(gc, "get_stats") else None
-        }
-
-    def run(self, runs=5, iterations=None):
-        iterations = iterations or self.ops_per_iter
-        results = []
-        for _ in range(runs):
-            results.append(self.run_once(iterations))
-            gc.collect()
-        times = sorted(r["time_s"] for r in results)
-        ops = sorted(r["ops_per_sec"] for r in results)
-        return {
-            "name": self.name,
-            "runs": runs,
-            "median_time_s": times[len(times)//2],
-            "median_ops_per_sec": ops[len(ops)//2],
-            "raw": results
-        }
+        return self.classify(self.n)
+
+    def sample_metrics(self, reps, elapsed):
+        return {"ns_per_element": elapsed / (reps * self.n) * 1e9}
+
+    def compare_variants(self, primary, variant_results):
+        ns = {}
+        for r in variant_results:
+            v = r["variant"]
+            ns.setdefault(v["strategy"], {})[v["n"]] = r["median_ns_per_element"]
+        # smallest n from which the best vectorized strategy stays ahead of each scalar one
+        crossover = {}
+        for strategy, curve in ns.items():
+            if strategy in VECTORIZED:
+                continue
+            crossover[strategy] = None
+            for n in sorted(curve, reverse=True):
+                best = min((ns[v][n] for v in VECTORIZED if n in ns.get(v, {})), default=None)
+                if best is None or best >= curve[n]:
+                    break
+                crossover[strategy] = n
+        return {"ns_per_element": ns, "vectorized_crossover_n": crossover}
 
 if __name__ == "__main__":
-    test = LogicControlTest()
-    result = test.run()
-    print(json.dumps(result, indent=2))
+    main(LogicControlTest, __file__)
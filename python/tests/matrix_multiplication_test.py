@@ -1,13 +1,120 @@
-import time
-import random
-import json
 import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from operator import mul
 
-class MatrixMultiplicationTestTest:
-    def __init__(self, size=100, runs=5):
+from bench_core import Benchmark, Skip, main
+from bench_fixtures import fixture, random_matrix
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import threadpoolctl
+except ImportError:
+    threadpoolctl = None
+
+SIZES = (64, 128, 256, 512, 1024, 2048, 4096)
+PYTHON_IMPLS = ("naive", "transposed", "blocked", "array_flat", "process_pool")
+IMPLEMENTATIONS = PYTHON_IMPLS + ("numpy", "numpy_1thread")
+
+
+def available_cpus():
+    # CPUs this process may run on; os.cpu_count() ignores taskset/cgroup affinity
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def numpy_matrix(rng, rows, cols):
+    return numpy.random.default_rng(rng.getrandbits(64)).random((rows, cols))
+
+
+def multiply_transposed(a, bt):
+    return [[sum(map(mul, row, col)) for col in bt] for row in a]
+
+
+def multiply_blocked(a, b, block):
+    n = len(a)
+    bt = [list(col) for col in zip(*b)]
+    c = [[0.0] * n for _ in range(n)]
+    for ii in range(0, n, block):
+        i_end = min(ii + block, n)
+        for kk in range(0, n, block):
+            k_end = min(kk + block, n)
+            a_tiles = [a[i][kk:k_end] for i in range(ii, i_end)]
+            for jj in range(0, n, block):
+                j_end = min(jj + block, n)
+                b_tiles = [bt[j][kk:k_end] for j in range(jj, j_end)]
+                for i, a_tile in zip(range(ii, i_end), a_tiles):
+                    ci = c[i]
+                    for j, b_tile in zip(range(jj, j_end), b_tiles):
+                        ci[j] += sum(map(mul, a_tile, b_tile))
+    return c
+
+
+def multiply_flat(a, b, n):
+    # i-k-j order walks both flat row-major buffers sequentially
+    c = array("d", bytes(8 * n * n))
+    for i in range(n):
+        row = i * n
+        for k in range(n):
+            aik = a[row + k]
+            col = k * n
+            for j in range(n):
+                c[row + j] += aik * b[col + j]
+    return c
+
+
+_bt = None
+
+
+def _init_rows(bt):
+    global _bt
+    _bt = bt
+
+
+def _multiply_rows(rows):
+    return multiply_transposed(rows, _bt)
+
+
+class MatrixMultiplicationTestTest(Benchmark):
+    # process_pool and multi-threaded BLAS both spread over every core
+    exclusive = True
+
+    def __init__(self, size=100, runs=5, seed=0, impl="naive", sizes=SIZES, impls=IMPLEMENTATIONS,
+                 python_max=256, block=32, workers=None):
+        super().__init__(runs=runs)
         self.name = "Matrix Multiplication"
         self.size = size
-        self.runs = runs
+        self.seed = seed
+        self.impl = impl
+        self.sizes = sizes
+        self.impls = impls
+        self.python_max = python_max
+        self.block = block
+        self.workers = workers or available_cpus()
+
+    @property
+    def ops_per_call(self):
+        return self.size ** 3
+
+    def params(self):
+        p = {"size": self.size, "seed": self.seed, "impl": self.impl}
+        if self.impl == "blocked":
+            p["block"] = self.block
+        elif self.impl == "process_pool":
+            p["workers"] = self.workers
+        elif self.impl.startswith("numpy"):
+            p["blas_threads"] = 1 if self.impl == "numpy_1thread" else "default"
+        return p
+
+    def variants(self):
+        # interpreted code stops at python_max: naive 4096^3 would run for hours
+        return [{"impl": i, "size": s} for i in self.impls for s in self.sizes
+                if i not in PYTHON_IMPLS or s <= self.python_max]
 
     def matrix_multiply(self, a, b):
         n = len(a)
@@ -20,36 +127,62 @@ class MatrixMultiplicationTestTest:
                 result[i][j] = s
         return result
 
-    def run_once(self):
-        A = [[random.random() for _ in range(self.size)] for _ in range(self.size)]
-        B = [[random.random() for _ in range(self.size)] for _ in range(self.size)]
-        t0 = time.perf_counter()
-        self.matrix_multiply(A, B)
-        t1 = time.perf_counter()
-        duration = t1 - t0
-        ops = (self.size ** 3) / (duration if duration > 0 else 1e-9)
-        return {"time_s": duration, "ops_per_sec": ops}
-
-    def run(self, runs=None, iterations=None):
-        # Keep backward compatibility with external test harness
-        if runs is not None:
-            self.runs = runs
-
-        results = [self.run_once() for _ in range(self.runs)]
-        times = sorted(r["time_s"] for r in results)
-        ops = sorted(r["ops_per_sec"] for r in results)
-        median_time = times[len(times)//2]
-        median_ops = ops[len(ops)//2]
-        return {
-            "name": self.name,
-            "runs": self.runs,
-            "median_time_s": median_time,
-            "median_ops_per_s": median_ops,
-            "raw": results
-        }
+    def setup(self):
+        self.pool = self.limiter = None
+        if self.impl.startswith("numpy"):
+            if numpy is None:
+                raise Skip("numpy is not installed")
+            if self.impl == "numpy_1thread":
+                if threadpoolctl is None:
+                    raise Skip("threadpoolctl is not installed")
+                self.limiter = threadpoolctl.threadpool_limits(limits=1, user_api="blas")
+            large = self.size >= 512
+            self.A = fixture("numpy_matrix", numpy_matrix, self.size, self.size, seed=self.seed, disk=large)
+            self.B = fixture("numpy_matrix", numpy_matrix, self.size, self.size, seed=self.seed + 1, disk=large)
+            return
+        # read-only inputs, shared with any other test asking for the same matrices
+        large = self.size >= 500
+        self.A = fixture("random_matrix", random_matrix, self.size, self.size, seed=self.seed, disk=large)
+        self.B = fixture("random_matrix", random_matrix, self.size, self.size, seed=self.seed + 1, disk=large)
+        if self.impl == "array_flat":
+            self.flat_a = array("d", (v for row in self.A for v in row))
+            self.flat_b = array("d", (v for row in self.B for v in row))
+        elif self.impl == "process_pool":
+            bt = [list(col) for col in zip(*self.B)]
+            self.pool = ProcessPoolExecutor(self.workers, initializer=_init_rows, initargs=(bt,))
+            step = -(-self.size // self.workers)
+            self.row_chunks = [self.A[i:i + step] for i in range(0, self.size, step)]
+
+    def teardown(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+        if self.limiter is not None:
+            self.limiter.unregister()
+
+    def workload(self):
+        impl = self.impl
+        if impl == "naive":
+            return self.matrix_multiply(self.A, self.B)
+        if impl == "transposed":
+            return multiply_transposed(self.A, list(zip(*self.B)))
+        if impl == "blocked":
+            return multiply_blocked(self.A, self.B, self.block)
+        if impl == "array_flat":
+            return multiply_flat(self.flat_a, self.flat_b, self.size)
+        if impl == "process_pool":
+            return [row for part in self.pool.map(_multiply_rows, self.row_chunks) for row in part]
+        return self.A @ self.B
+
+    def sample_metrics(self, reps, elapsed):
+        # one multiply and one add per inner step
+        return {"gflops": 2 * self.size ** 3 * reps / elapsed / 1e9 if elapsed > 0 else 0}
+
+    def compare_variants(self, primary, variant_results):
+        table = {}
+        for r in variant_results:
+            v = r["variant"]
+            table.setdefault(v["impl"], {})[v["size"]] = r["median_gflops"]
+        return {"gflops_by_impl": table}
 
 if __name__ == "__main__":
-    result = MatrixMultiplicationTestTest().run()
-    with open("results_python_matrix_multiplication.json", "w") as f:
-        json.dump(result, f, indent=2)
-    print(json.dumps(result, indent=2))
+    main(MatrixMultiplicationTestTest, __file__)
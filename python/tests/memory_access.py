@@ -1,61 +1,214 @@
-import time, tracemalloc, random, json
+import random
+import sys
+from array import array
+from collections import namedtuple
+from dataclasses import dataclass
 
-class MemoryAccessTest:
+from bench_core import Benchmark, Skip, main, traced_size
+from bench_fixtures import fixture
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# 1e3 elements sits in L1 for packed storage; pass larger sizes (1e8+) for multi-GB sets
+SIZES = (1_000, 100_000, 1_000_000)
+PATTERNS = ("sequential", "strided", "random", "chase")
+STORAGES = ("list", "array", "memoryview", "numpy", "objects", "slots", "namedtuple", "dataclass_slots")
+RECORDS = {"objects", "slots", "namedtuple", "dataclass_slots"}
+# elements measured for bytes/element; the per-element cost does not depend on size
+FOOTPRINT_SAMPLE = 100_000
+
+
+class Node:
+    def __init__(self, value, next):
+        self.value = value
+        self.next = next
+
+
+class SlotNode:
+    __slots__ = ("value", "next")
+
+    def __init__(self, value, next):
+        self.value = value
+        self.next = next
+
+
+TupleNode = namedtuple("TupleNode", "value next")
+
+if sys.version_info >= (3, 10):
+    @dataclass(slots=True)
+    class DataNode:
+        value: int
+        next: int
+else:
+    DataNode = None
+
+NODE_TYPES = {"objects": Node, "slots": SlotNode, "namedtuple": TupleNode, "dataclass_slots": DataNode}
+
+
+def chase_cycle(rng, n):
+    """next-index table forming one random cycle through all n slots (Sattolo)."""
+    order = list(range(n))
+    for i in range(n - 1, 0, -1):
+        j = rng.randrange(i)
+        order[i], order[j] = order[j], order[i]
+    nxt = [0] * n
+    for i in range(n):
+        nxt[order[i]] = order[(i + 1) % n]
+    return nxt
+
+
+def shuffled_indices(rng, n):
+    indices = list(range(n))
+    rng.shuffle(indices)
+    return indices
+
+
+def build_storage(kind, nxt):
+    # every element holds the index of its successor, so "chase" is a chain of
+    # dependent loads and the other patterns sum the same values in every storage;
+    # records carry it in both fields: the scans read .value, chase follows .next
+    if kind == "list":
+        return list(nxt)
+    if kind == "array":
+        return array("q", nxt)
+    if kind == "memoryview":
+        return memoryview(bytearray(array("q", nxt).tobytes())).cast("q")
+    if kind == "numpy":
+        return numpy.array(nxt, dtype=numpy.int64)
+    node = NODE_TYPES[kind]
+    return [node(n, n) for n in nxt]
+
+
+class MemoryAccessTest(Benchmark):
     name = "MemoryAccess"
+    default_runs = 3
+
+    def __init__(self, ops_per_iter=None, size=10_000, storage="list", pattern="random", stride=16,
+                 seed=0, sizes=SIZES, storages=STORAGES, patterns=PATTERNS):
+        super().__init__(ops_per_iter)
+        self.size = size
+        self.storage = storage
+        self.pattern = pattern
+        self.stride = stride
+        self.seed = seed
+        self.sizes = sizes
+        self.storages = storages
+        self.patterns = patterns
+        self._built = (None, None)
+        self._footprints = {}
+
+    @property
+    def ops_per_call(self):
+        # one element access per op, whatever the pattern
+        return self.size
 
-    def __init__(self, ops_per_iter=5_000_000):
-        self.ops_per_iter = ops_per_iter
+    def params(self):
+        p = {"size": self.size, "storage": self.storage, "pattern": self.pattern}
+        if self.pattern == "strided":
+            p["stride"] = self.stride
+        return p
 
-    def workload(self, size=10_000):
-        arr = list(range(size))
+    def variants(self):
+        # patterns innermost, so consecutive variants reuse one built storage
+        return [{"storage": st, "size": n, "pattern": p}
+                for st in self.storages for n in self.sizes for p in self.patterns]
+
+    def setup(self):
+        if self.storage == "numpy" and numpy is None:
+            raise Skip("numpy is not installed")
+        if self.storage == "dataclass_slots" and DataNode is None:
+            raise Skip("dataclass(slots=True) needs Python 3.10+")
+        large = self.size >= 1_000_000
+        key = (self.storage, self.size, self.seed)
+        if self._built[0] != key:
+            self._built = (None, None)
+            nxt = fixture("chase_cycle", chase_cycle, self.size, seed=self.seed, disk=large)
+            self._built = (key, build_storage(self.storage, nxt))
+        self.data = self._built[1]
+        self.indices = None
+        if self.pattern == "random":
+            self.indices = fixture("shuffled_indices", shuffled_indices, self.size, seed=self.seed, disk=large)
+            if self.storage == "numpy":
+                self.indices = numpy.array(self.indices, dtype=numpy.intp)
+        if self.storage not in self._footprints:
+            # built from fresh ints, so the elements a list or record owns are counted
+            rng = random.Random(self.seed)
+            size = traced_size(lambda: build_storage(self.storage, chase_cycle(rng, FOOTPRINT_SAMPLE)))
+            self._footprints[self.storage] = size / FOOTPRINT_SAMPLE
+        self.bytes_per_element = self._footprints[self.storage]
+
+    def teardown(self):
+        self.data = self.indices = None
+
+    def _workload(self):
+        data, n = self.data, self.size
+        pattern = self.pattern
         s = 0
-        for v in arr:
-            s += v
-        indices = list(range(size))
-        random.shuffle(indices)
-        for i in indices:
-            s -= arr[i]
+        if self.storage == "numpy":
+            # whole-array operations, except the chase which is serial by nature
+            if pattern == "sequential":
+                return int(data.sum())
+            if pattern == "strided":
+                return sum(int(data[off::self.stride].sum()) for off in range(self.stride))
+            if pattern == "random":
+                return int(data[self.indices].sum())
+            i = 0
+            for _ in range(n):
+                i = data[i]
+            return int(i)
+        if self.storage in RECORDS:
+            if pattern == "sequential":
+                for r in data:
+                    s += r.value
+            elif pattern == "strided":
+                for off in range(self.stride):
+                    for i in range(off, n, self.stride):
+                        s += data[i].value
+            elif pattern == "random":
+                for i in self.indices:
+                    s += data[i].value
+            else:
+                i = 0
+                for _ in range(n):
+                    i = data[i].next
+                s = i
+            return s
+        if pattern == "sequential":
+            for v in data:
+                s += v
+        elif pattern == "strided":
+            for off in range(self.stride):
+                for i in range(off, n, self.stride):
+                    s += data[i]
+        elif pattern == "random":
+            for i in self.indices:
+                s += data[i]
+        else:
+            i = 0
+            for _ in range(n):
+                i = data[i]
+            s = i
         return s
 
-    def run_once(self, iterations):
-        reps = max(1, iterations // 10_000)
-        tracemalloc.start()
-        t0 = time.perf_counter()
-        acc = 0
-        for _ in range(reps):
-            acc += self.workload(10_000)
-        t1 = time.perf_counter()
-        current, peak = tracemalloc.get_traced_memory()
-        tracemalloc.stop()
-        duration = t1 - t0
-        ops_done = reps * 10_000
-        return {
-            "time_s": duration,
-            "ops": ops_done,
-            "ops_per_sec": ops_done / duration if duration > 0 else float("inf"),
-            "mem_peak_bytes": peak,
-            "acc": acc
-        }
+    def workload(self):
+        return self._workload()
 
-    def run(self, runs=5, iterations=None):
-        if iterations is None:
-            iterations = self.ops_per_iter
-        results = [self.run_once(iterations) for _ in range(runs)]
-        times = sorted(r["time_s"] for r in results)
-        ops = sorted(r["ops_per_sec"] for r in results)
-        peak_mem = sorted(r["mem_peak_bytes"] for r in results)
-        mid = len(times) // 2
+    def sample_metrics(self, reps, elapsed):
         return {
-            "name": self.name,
-            "runs": runs,
-            "median_time_s": times[mid],
-            "median_ops_per_sec": ops[mid],
-            "median_peak_mem_bytes": peak_mem[mid],
-            "raw": results
+            "ns_per_access": elapsed / (reps * self.size) * 1e9,
+            "bytes_per_element": self.bytes_per_element,
         }
-    
+
+    def compare_variants(self, primary, variant_results):
+        ns, footprint = {}, {}
+        for r in variant_results:
+            v = r["variant"]
+            ns.setdefault(v["storage"], {}).setdefault(v["pattern"], {})[v["size"]] = r["median_ns_per_access"]
+            footprint[v["storage"]] = r["median_bytes_per_element"]
+        return {"ns_per_access": ns, "bytes_per_element": footprint}
+
 if __name__ == "__main__":
-    result = MemoryAccessTest().run()
-    with open("results_python_compression_test.json", "w") as f:
-        json.dump(result, f, indent=4)
-    print(json.dumps(result, indent=4))
\ No newline at end of file
+    main(MemoryAccessTest, __file__)
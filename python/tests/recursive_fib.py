@@ -1,57 +1,276 @@
-import time, tracemalloc, json
+import functools
+from collections import OrderedDict
 
-class RecursiveFibTest:
+from bench_core import Benchmark, main
+from bench_fixtures import fixture
+
+SHAPES = ("method", "function", "closure", "staticmethod", "partial")
+MAXSIZES = (128, 1024, 8192)
+STREAMS = ("hit_heavy", "miss_heavy")
+ALGORITHMS = ("iterative", "fast_doubling", "matrix_power")
+BIG_NS = (1_000, 100_000, 1_000_000)
+
+
+def fib_calls(n):
+    """Calls made by the naive recursion for fib(n): 2*fib(n+1) - 1."""
+    a, b = 0, 1
+    for _ in range(n + 1):
+        a, b = b, a + b
+    return 2 * a - 1
+
+
+def fib(x):
+    if x < 2:
+        return x
+    return fib(x - 1) + fib(x - 2)
+
+
+def make_closure_fib():
+    def inner(x):
+        if x < 2:
+            return x
+        return inner(x - 1) + inner(x - 2)
+    return inner
+
+
+class _Static:
+    @staticmethod
+    def fib(x):
+        if x < 2:
+            return x
+        return _Static.fib(x - 1) + _Static.fib(x - 2)
+
+
+def _fib_step(x, step):
+    if x < 2:
+        return x
+    return _partial_fib(x - step) + _partial_fib(x - 2 * step)
+
+
+_partial_fib = functools.partial(_fib_step, step=1)
+
+
+def fib_iterative(n):
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return a
+
+
+def fib_fast_doubling(n):
+    a, b = 0, 1  # fib(k), fib(k+1) for the prefix of n's bits seen so far
+    for bit in bin(n)[2:]:
+        c = a * (2 * b - a)
+        d = a * a + b * b
+        a, b = (d, c + d) if bit == "1" else (c, d)
+    return a
+
+
+def fib_matrix_power(n):
+    def mul(m, k):
+        return (m[0] * k[0] + m[1] * k[2], m[0] * k[1] + m[1] * k[3],
+                m[2] * k[0] + m[3] * k[2], m[2] * k[1] + m[3] * k[3])
+
+    result, base = (1, 0, 0, 1), (1, 1, 1, 0)
+    while n:
+        if n & 1:
+            result = mul(result, base)
+        base = mul(base, base)
+        n >>= 1
+    return result[1]
+
+
+FAST = {"iterative": fib_iterative, "fast_doubling": fib_fast_doubling, "matrix_power": fib_matrix_power}
+
+
+def _memoized(k):
+    return k * k + 1
+
+
+def dict_memo(func):
+    memo = {}
+
+    def wrapper(k):
+        try:
+            return memo[k]
+        except KeyError:
+            value = memo[k] = func(k)
+            return value
+    wrapper.cache_clear = memo.clear
+    return wrapper
+
+
+class SlotsLRU:
+    """Hand-written LRU: a hit moves the key to the end, a miss past maxsize
+    evicts from the front."""
+    __slots__ = ("func", "maxsize", "data")
+
+    def __init__(self, func, maxsize):
+        self.func = func
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+
+    def __call__(self, k):
+        data = self.data
+        try:
+            data.move_to_end(k)
+            return data[k]
+        except KeyError:
+            value = data[k] = self.func(k)
+            if len(data) > self.maxsize:
+                data.popitem(last=False)
+            return value
+
+    def cache_clear(self):
+        self.data.clear()
+
+
+def make_memo(name, func=_memoized):
+    if name == "cache":
+        return functools.cache(func)
+    if name == "dict":
+        return dict_memo(func)
+    kind, _, size = name.rpartition("_")
+    if kind == "lru":
+        return functools.lru_cache(maxsize=int(size))(func)
+    if kind == "slots_lru":
+        return SlotsLRU(func, int(size))
+    raise ValueError(f"unknown memo {name!r}")
+
+
+def hit_ratio(name, keys):
+    """Fraction of keys answered from the cache in one cold pass."""
+    misses = 0
+
+    def counting(k):
+        nonlocal misses
+        misses += 1
+        return _memoized(k)
+
+    probe = make_memo(name, counting)
+    for k in keys:
+        probe(k)
+    return 1 - misses / len(keys)
+
+
+def key_stream(rng, kind, length):
+    if kind == "hit_heavy":
+        # Zipf-like reuse of 1000 hot keys
+        keys = range(1000)
+        return rng.choices(keys, weights=[1.0 / (k + 1) for k in keys], k=length)
+    if kind == "miss_heavy":
+        return [rng.randrange(10_000_000) for _ in range(length)]
+    raise ValueError(f"unknown stream {kind!r}")
+
+
+class RecursiveFibTest(Benchmark):
     name = "RecursiveFibonacci"
+    default_runs = 3
 
-    def __init__(self, n=24):
+    def __init__(self, n=24, shape="method", memo=None, stream="hit_heavy", algorithm=None, big_n=100_000,
+                 shapes=SHAPES, maxsizes=MAXSIZES, streams=STREAMS, algorithms=ALGORITHMS, big_ns=BIG_NS,
+                 stream_len=100_000, iterative_max=100_000, seed=0):
+        super().__init__()
         self.n = n
+        self.shape = shape
+        self.memo = memo
+        self.stream = stream
+        self.algorithm = algorithm
+        self.big_n = big_n
+        self.shapes = shapes
+        self.maxsizes = maxsizes
+        self.streams = streams
+        self.algorithms = algorithms
+        self.big_ns = big_ns
+        self.stream_len = stream_len
+        self.iterative_max = iterative_max
+        self.seed = seed
+
+    @property
+    def ops_per_call(self):
+        if self.algorithm:
+            # one fib(big_n) per call
+            return 1
+        if self.memo:
+            return self.stream_len
+        # one fib(n) per call, the unit runner.c compares against ruby's 1/duration;
+        # recursive calls per second are reported separately as calls_per_sec
+        return 1
+
+    def params(self):
+        if self.algorithm:
+            return {"algorithm": self.algorithm, "n": self.big_n}
+        if self.memo:
+            return {"memo": self.memo, "stream": self.stream, "stream_len": self.stream_len}
+        return {"n": self.n, "shape": self.shape}
+
+    def memos(self):
+        return (["cache", "dict"] + [f"lru_{m}" for m in self.maxsizes]
+                + [f"slots_lru_{m}" for m in self.maxsizes])
+
+    def variants(self):
+        out = [{"shape": s} for s in self.shapes if s != self.shape]
+        out += [{"memo": m, "stream": st} for m in self.memos() for st in self.streams]
+        # the O(n) loop over million-digit ints takes tens of seconds per call
+        out += [{"algorithm": a, "big_n": n} for a in self.algorithms for n in self.big_ns
+                if a != "iterative" or n <= self.iterative_max]
+        return out
 
     def fib(self, x):
-        # iterative fallback for large n
-        if x > 40:
-            a, b = 0, 1
-            for _ in range(x):
-                a, b = b, a + b
-            return a
         if x < 2:
             return x
         return self.fib(x - 1) + self.fib(x - 2)
 
-    def run_once(self):
-        tracemalloc.start()
-        t0 = time.perf_counter()
-        result = self.fib(self.n)
-        t1 = time.perf_counter()
-        current, peak = tracemalloc.get_traced_memory()
-        tracemalloc.stop()
-        duration = t1 - t0
-        return {
-            "time_s": duration,
-            "result": result,
-            "mem_peak_bytes": peak,
-            "ops_per_sec": 1.0 / duration if duration > 0 else float('inf')
-        }
-
-    def run(self, runs=None, iterations=None):
-        if runs is None:
-            runs = 3
-        results = [self.run_once() for _ in range(runs)]
-        times = sorted(r["time_s"] for r in results)
-        ops = sorted(r["ops_per_sec"] for r in results)
-        peaks = sorted(r["mem_peak_bytes"] for r in results)
-        mid = len(times) // 2
-        return {
-            "name": self.name,
-            "runs": runs,
-            "median_time_sec": times[mid],
-            "median_ops_per_sec": ops[mid],
-            "median_peak_mem_bytes": peaks[mid],
-            "raw": results
-        }
+    def setup(self):
+        if self.algorithm:
+            self.fast = FAST[self.algorithm]
+        elif self.memo:
+            self.cached = make_memo(self.memo)
+            self.keys = fixture("key_stream", key_stream, self.stream, self.stream_len, seed=self.seed)
+            self.hit_ratio = hit_ratio(self.memo, self.keys)
+        else:
+            self.call = {
+                "method": self.fib,
+                "function": fib,
+                "closure": make_closure_fib(),
+                "staticmethod": _Static.fib,
+                "partial": _partial_fib,
+            }[self.shape]
+
+    def workload(self):
+        if self.algorithm:
+            return self.fast(self.big_n)
+        if self.memo:
+            cached = self.cached
+            cached.cache_clear()
+            for k in self.keys:
+                cached(k)
+            return len(self.keys)
+        return self.call(self.n)
+
+    def sample_metrics(self, reps, elapsed):
+        if self.algorithm:
+            return {}
+        if self.memo:
+            return {"hit_ratio": self.hit_ratio}
+        return {"calls_per_sec": fib_calls(self.n) * reps / elapsed if elapsed > 0 else 0}
+
+    def compare_variants(self, primary, variant_results):
+        shapes = {self.shape: primary["median_calls_per_sec"]}
+        memos, fast = {}, {}
+        for r in variant_results:
+            v = r["variant"]
+            if "shape" in v:
+                shapes[v["shape"]] = r["median_calls_per_sec"]
+            elif "memo" in v:
+                memos.setdefault(v["memo"], {})[v["stream"]] = {
+                    "lookups_per_sec": r["median_ops_per_sec"],
+                    "ns_per_lookup": r["median_ns_per_op"],
+                    "hit_ratio": r["median_hit_ratio"],
+                }
+            else:
+                fast.setdefault(v["algorithm"], {})[v["big_n"]] = r["median_time_s"] / r["reps"]
+        return {"calls_per_sec_by_shape": shapes, "memo": memos, "big_n_seconds": fast}
 
 if __name__ == "__main__":
-    test = RecursiveFibTest(24)
-    result = test.run()
-    with open("results_python_recursive_fib.json", "w") as f:
-        json.dump(result, f, indent=2)
-    print(json.dumps(result, indent=2))
+    main(RecursiveFibTest, __file__)
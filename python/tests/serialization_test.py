@@ -1,10 +1,98 @@
-import time, json, gc, tracemalloc
+import json
+import marshal
+import pickle
+import struct
+import time
+from array import array
 
-class SerializationTestTest:
+from bench_core import Benchmark, Skip, main, traced_peak
+from bench_fixtures import fixture
+from json_serialization_test import JsonSerializationTestTest
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+FORMATS = (
+    "json", "pickle2", "pickle3", "pickle4", "pickle5", "pickle5_oob",
+    "marshal", "struct", "array",
+) + (("orjson",) if orjson else ()) + (("msgpack",) if msgpack else ())
+DATASETS = ("records", "nested", "blobs")
+# fixed-width layout for the flat sample_data records
+RECORD = struct.Struct("<q16sd?" + "8s" * 5)
+
+
+def _struct_encode(records):
+    buf = bytearray(RECORD.size * len(records))
+    pack_into, size = RECORD.pack_into, RECORD.size
+    for i, r in enumerate(records):
+        pack_into(buf, i * size, r["id"], r["name"].encode(), r["nested"]["val"],
+                  r["nested"]["flag"], *(t.encode() for t in r["tags"]))
+    return bytes(buf)
+
+
+def _struct_decode(data):
+    out = []
+    for rid, name, val, flag, *tags in RECORD.iter_unpack(data):
+        out.append({
+            "id": rid,
+            "name": name.rstrip(b"\0").decode(),
+            "nested": {"val": val, "flag": flag},
+            "tags": [t.rstrip(b"\0").decode() for t in tags],
+        })
+    return out
+
+
+def _array_encode(records):
+    # columnar: one typed array per numeric field, NUL-joined text columns
+    ids = array("q", (r["id"] for r in records))
+    vals = array("d", (r["nested"]["val"] for r in records))
+    flags = array("b", (r["nested"]["flag"] for r in records))
+    names = "\0".join(r["name"] for r in records).encode()
+    tags = "\0".join("\x1f".join(r["tags"]) for r in records).encode()
+    parts = [ids.tobytes(), vals.tobytes(), flags.tobytes(), names, tags]
+    header = struct.pack("<6Q", len(records), *(len(p) for p in parts))
+    return header + b"".join(parts)
+
+
+def _array_decode(data):
+    n, *lengths = struct.unpack_from("<6Q", data)
+    view, off, cols = memoryview(data), 48, []
+    for length in lengths:
+        cols.append(view[off:off + length])
+        off += length
+    ids, vals, flags = array("q"), array("d"), array("b")
+    ids.frombytes(cols[0])
+    vals.frombytes(cols[1])
+    flags.frombytes(cols[2])
+    names = bytes(cols[3]).decode().split("\0")
+    tags = bytes(cols[4]).decode().split("\0")
+    return [
+        {"id": ids[i], "name": names[i], "nested": {"val": vals[i], "flag": bool(flags[i])},
+         "tags": tags[i].split("\x1f")}
+        for i in range(n)
+    ]
+
+
+class SerializationTestTest(Benchmark):
     name = "Serialization"
+    default_runs = 3
 
-    def __init__(self, ops_per_iter=1000):
-        self.ops_per_iter = ops_per_iter
+    def __init__(self, ops_per_iter=None, format="json", dataset="records",
+                 formats=FORMATS, datasets=DATASETS, blob_count=200, blob_size=16 * 1024):
+        super().__init__(ops_per_iter)
+        self.format = format
+        self.dataset = dataset
+        self.formats = formats
+        self.datasets = datasets
+        self.blob_count = blob_count
+        self.blob_size = blob_size
         self.sample_data = [
             {
                 "id": i,
@@ -14,54 +102,115 @@ class SerializationTestTest:
             }
             for i in range(1000)
         ]
-        self.encoded = json.dumps(self.sample_data)
+        self._datasets = {"records": self.sample_data}
 
-    def workload(self):
-        decoded = json.loads(self.encoded)
-        encoded = json.dumps(decoded)
-        return len(encoded)
+    def params(self):
+        return {"format": self.format, "dataset": self.dataset, "encoded_bytes": self.encoded_bytes}
 
-    def run_once(self, iterations):
-        gc.collect()
-        tracemalloc.start()
-        t0 = time.perf_counter()
+    def variants(self):
+        return [{"format": f, "dataset": d} for d in self.datasets for f in self.formats]
 
-        total_size = 0
-        for _ in range(iterations):
-            total_size += self.workload()
+    def _data(self, name):
+        if name not in self._datasets:
+            if name == "nested":
+                gen = JsonSerializationTestTest
+                self._datasets[name] = fixture("nested_trees", gen.nested_trees, 20, 3, 50)
+            elif name == "blobs":
+                self._datasets[name] = [
+                    {"id": i, "payload": bytearray(i % 251 for i in range(self.blob_size))}
+                    for i in range(self.blob_count)
+                ]
+            else:
+                raise ValueError(f"unknown dataset {name!r}")
+        return self._datasets[name]
 
-        t1 = time.perf_counter()
-        _, peak = tracemalloc.get_traced_memory()
-        tracemalloc.stop()
+    def _codec(self):
+        fmt = self.format
+        if fmt == "json":
+            if self.dataset == "blobs":
+                raise Skip("json cannot encode binary payloads")
+            return json.dumps, json.loads
+        if fmt.startswith("pickle") and fmt != "pickle5_oob":
+            protocol = int(fmt[len("pickle"):])
+            return (lambda obj: pickle.dumps(obj, protocol=protocol)), pickle.loads
+        if fmt == "pickle5_oob":
+            return self._oob_dumps, self._oob_loads
+        if fmt == "marshal":
+            return marshal.dumps, marshal.loads
+        if fmt in ("struct", "array"):
+            if self.dataset != "records":
+                raise Skip(f"{fmt} encodes fixed flat records only")
+            return (_struct_encode, _struct_decode) if fmt == "struct" else (_array_encode, _array_decode)
+        if fmt == "orjson":
+            if orjson is None:
+                raise Skip("orjson is not installed")
+            if self.dataset == "blobs":
+                raise Skip("orjson cannot encode binary payloads")
+            return orjson.dumps, orjson.loads
+        if fmt == "msgpack":
+            if msgpack is None:
+                raise Skip("msgpack is not installed")
+            return msgpack.packb, (lambda b: msgpack.unpackb(b, raw=False))
+        raise ValueError(f"unknown format {fmt!r}")
 
-        duration = t1 - t0
-        return {
-            "time_s": duration,
-            "ops": iterations,
-            "ops_per_sec": iterations / duration if duration > 0 else float("inf"),
-            "mem_peak_bytes": peak,
-            "size_processed": total_size,
-        }
+    def _oob_dumps(self, obj):
+        buffers = []
+        data = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+        return data, buffers
 
-    def run(self, runs=3, iterations=None):
-        if iterations is None:
-            iterations = self.ops_per_iter
+    def _oob_loads(self, encoded):
+        data, buffers = encoded
+        return pickle.loads(data, buffers=buffers)
 
-        results = [self.run_once(iterations) for _ in range(runs)]
-        times = sorted(r["time_s"] for r in results)
-        ops = sorted(r["ops_per_sec"] for r in results)
-        peaks = sorted(r["mem_peak_bytes"] for r in results)
-        mid = len(times) // 2
+    def _size(self, encoded):
+        if self.format == "pickle5_oob":
+            data, buffers = encoded
+            return len(data) + sum(b.raw().nbytes for b in buffers)
+        return len(encoded)
 
+    def setup(self):
+        self.encode, self.decode = self._codec()
+        self.data = self._data(self.dataset)
+        if self.format == "pickle5_oob" and self.dataset == "blobs":
+            # only PickleBuffer-wrapped payloads travel out of band
+            self.data = [{"id": r["id"], "payload": pickle.PickleBuffer(r["payload"])} for r in self.data]
+        self.encoded_bytes = self._size(self.encode(self.data))
+        self.peak_mem_bytes = traced_peak(self.workload)
+        self.counters = {}
+
+    def workload(self):
+        clock = time.perf_counter
+        t0 = clock()
+        encoded = self.encode(self.data)
+        t1 = clock()
+        self.decode(encoded)
+        t2 = clock()
+        self.counters["encode_s"] = self.counters.get("encode_s", 0.0) + (t1 - t0)
+        self.counters["decode_s"] = self.counters.get("decode_s", 0.0) + (t2 - t1)
+
+    def sample_metrics(self, reps, elapsed):
+        mb = self.encoded_bytes * reps / (1024 * 1024)
+        enc, dec = self.counters["encode_s"], self.counters["decode_s"]
         return {
-            "name": self.name,
-            "runs": runs,
-            "median_time_s": times[mid],
-            "median_ops_per_sec": ops[mid],
-            "median_peak_mem_bytes": peaks[mid],
-            "raw": results,
+            "encode_s": enc,
+            "decode_s": dec,
+            "encode_MBps": mb / enc if enc > 0 else 0,
+            "decode_MBps": mb / dec if dec > 0 else 0,
+            "encoded_bytes": self.encoded_bytes,
+            "peak_mem_bytes": self.peak_mem_bytes,
         }
 
+    def compare_variants(self, primary, variant_results):
+        table = {}
+        for r in variant_results:
+            v = r["variant"]
+            table.setdefault(v["dataset"], {})[v["format"]] = {
+                "encoded_bytes": r["median_encoded_bytes"],
+                "encode_MBps": r["median_encode_MBps"],
+                "decode_MBps": r["median_decode_MBps"],
+                "peak_mem_bytes": r["median_peak_mem_bytes"],
+            }
+        return {"formats": table}
+
 if __name__ == "__main__":
-    result = SerializationTestTest(ops_per_iter=200).run(runs=5)
-    print(json.dumps(result, indent=2))
+    main(SerializationTestTest, __file__)
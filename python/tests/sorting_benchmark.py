@@ -1,57 +1,224 @@
-import random, time, json, tracemalloc, gc
+import bisect
+import heapq
+import itertools
+import os
+import tempfile
+from array import array
+from operator import attrgetter
 
-class SortingBenchmarkTest:
-    name = "SortingBenchmark"
+from bench_core import Benchmark, Skip, main
+from bench_fixtures import fixture, random_ints
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+DISTRIBUTIONS = ("random", "sorted", "reversed", "nearly_sorted", "duplicates", "strings", "tuples")
+ALGORITHMS = ("list_sort", "key_lambda", "attrgetter", "nsmallest", "insort", "array",
+              "np_quicksort", "np_mergesort", "np_stable", "external")
+INT_DISTRIBUTIONS = {"random", "sorted", "reversed", "nearly_sorted", "duplicates"}
+NUMPY_KINDS = {"np_quicksort": "quicksort", "np_mergesort": "mergesort", "np_stable": "stable"}
+# memory for the unsorted copies list_sort stages per batch
+STAGE_BYTES = 64 * 1024 * 1024
+
+
+def make_distribution(rng, kind, n):
+    if kind == "random":
+        return random_ints(rng, n)
+    if kind == "sorted":
+        return sorted(random_ints(rng, n))
+    if kind == "reversed":
+        return sorted(random_ints(rng, n), reverse=True)
+    if kind == "nearly_sorted":
+        data = sorted(random_ints(rng, n))
+        for _ in range(max(1, n // 100)):
+            i, j = rng.randrange(n), rng.randrange(n)
+            data[i], data[j] = data[j], data[i]
+        return data
+    if kind == "duplicates":
+        return random_ints(rng, n, 0, 9)
+    if kind == "strings":
+        letters = "abcdefghijklmnopqrstuvwxyz"
+        return ["".join(rng.choices(letters, k=8)) for _ in range(n)]
+    if kind == "tuples":
+        return [(rng.randint(0, 99), rng.randint(0, 1_000_000)) for _ in range(n)]
+    raise ValueError(f"unknown distribution {kind!r}")
+
+
+class Record:
+    __slots__ = ("value", "payload")
+
+    def __init__(self, value, payload):
+        self.value = value
+        self.payload = payload
+
+
+def external_sort(src, dst, budget, tmpdir=None):
+    """Sort a file of one int per line holding at most `budget` values in memory.
+    Returns the number of sorted runs merged."""
+    runs = []
+    try:
+        with open(src) as f:
+            while True:
+                chunk = [int(line) for line in itertools.islice(f, budget)]
+                if not chunk:
+                    break
+                chunk.sort()
+                fd, path = tempfile.mkstemp(prefix="sort_run_", dir=tmpdir)
+                runs.append(path)
+                with os.fdopen(fd, "w") as out:
+                    out.write("\n".join(map(str, chunk)))
+                    out.write("\n")
+        files = [open(path) for path in runs]
+        try:
+            with open(dst, "w") as out:
+                out.writelines(f"{v}\n" for v in heapq.merge(*(map(int, f) for f in files)))
+        finally:
+            for f in files:
+                f.close()
+    finally:
+        for path in runs:
+            os.remove(path)
+    return len(runs)
 
-    def __init__(self, n=10000, ops_per_iter=None):
+
+class SortingBenchmarkTest(Benchmark):
+    name = "SortingBenchmark"
+    def __init__(self, n=10000, ops_per_iter=None, seed=0, distribution="random", algorithm="list_sort",
+                 sizes=SIZES, distributions=DISTRIBUTIONS, algorithms=ALGORITHMS, top_k=100,
+                 insort_max=100_000, external_n=1_000_000, memory_budget=100_000):
+        super().__init__(ops_per_iter)
         self.n = n
-        self.ops_per_iter = ops_per_iter or n  # for consistency with other tests
+        self.seed = seed
+        self.distribution = distribution
+        self.algorithm = algorithm
+        self.sizes = sizes
+        self.distributions = distributions
+        self.algorithms = algorithms
+        self.top_k = top_k
+        self.insort_max = insort_max
+        self.external_n = external_n
+        self.memory_budget = memory_budget
 
-    def workload(self):
-        data = [random.randint(0, 1_000_000) for _ in range(self.n)]
-        data.sort()
-        return sum(data[:100])  # checksum for sanity
+    @property
+    def ops_per_call(self):
+        # Estimate operations as n * log2(n); the same unit for every algorithm,
+        # so ops/sec compares them directly
+        return int(self.n * (self.n.bit_length()))
 
-    def run_once(self):
-        gc.collect()
-        tracemalloc.start()
-        t0 = time.perf_counter()
+    def params(self):
+        p = {"n": self.n, "seed": self.seed, "distribution": self.distribution, "algorithm": self.algorithm}
+        if self.algorithm == "nsmallest":
+            p["top_k"] = self.top_k
+        elif self.algorithm == "external":
+            p["memory_budget"] = self.memory_budget
+        return p
 
-        checksum = self.workload()
+    def variants(self):
+        out = [{"n": s} for s in self.sizes if s != self.n]
+        out += [{"distribution": d} for d in self.distributions if d != self.distribution]
+        for a in self.algorithms:
+            if a == self.algorithm:
+                continue
+            out.append({"algorithm": a, "n": self.external_n} if a == "external" else {"algorithm": a})
+        return out
 
-        t1 = time.perf_counter()
-        current, peak = tracemalloc.get_traced_memory()
-        tracemalloc.stop()
+    def setup(self):
+        alg = self.algorithm
+        if alg in NUMPY_KINDS and numpy is None:
+            raise Skip("numpy is not installed")
+        if alg in ("array", "external") or alg in NUMPY_KINDS:
+            if self.distribution not in INT_DISTRIBUTIONS:
+                raise Skip(f"{alg} sorts integers only")
+        if alg == "insort" and self.n > self.insort_max:
+            raise Skip(f"insort is quadratic; n > {self.insort_max}")
+        self.data = fixture("sort_input", make_distribution, self.distribution, self.n,
+                            seed=self.seed, disk=self.n >= 1_000_000)
+        self.path = self.sorted_path = None
+        if alg in ("key_lambda", "attrgetter"):
+            self.records = [Record(v, i) for i, v in enumerate(self.data)]
+        elif alg == "array":
+            self.array = array("q", self.data)
+        elif alg in NUMPY_KINDS:
+            self.array = numpy.array(self.data, dtype=numpy.int64)
+        elif alg == "external":
+            fd, self.path = tempfile.mkstemp(prefix="sort_in_", suffix=".txt")
+            with os.fdopen(fd, "w") as f:
+                f.write("\n".join(map(str, self.data)))
+                f.write("\n")
+            fd, self.sorted_path = tempfile.mkstemp(prefix="sort_out_", suffix=".txt")
+            os.close(fd)
 
-        duration = t1 - t0
-        # Estimate operations as n * log2(n)
-        ops_done = int(self.n * (self.n.bit_length()))
+    def teardown(self):
+        for path in (self.path, self.sorted_path):
+            if path:
+                os.remove(path)
 
-        return {
-            "time_s": duration,
-            "ops": ops_done,
-            "ops_per_sec": ops_done / duration if duration > 0 else float("inf"),
-            "mem_peak_bytes": peak,
-            "checksum": checksum
-        }
+    @property
+    def prepare_batch(self):
+        # each staged copy is a list of n pointers; keep a batch under STAGE_BYTES
+        return max(1, STAGE_BYTES // (8 * self.n))
+
+    def prepare(self, reps):
+        if self.algorithm == "list_sort":
+            # sort() works in place, so every rep gets its own unsorted copy
+            self.pending = [list(self.data) for _ in range(reps)]
+
+    def workload(self):
+        alg = self.algorithm
+        if alg == "list_sort":
+            data = self.pending.pop()
+            data.sort()
+            return data[0]
+        if alg == "key_lambda":
+            return sorted(self.records, key=lambda r: r.value)[0].value
+        if alg == "attrgetter":
+            return sorted(self.records, key=attrgetter("value"))[0].value
+        if alg == "nsmallest":
+            return heapq.nsmallest(self.top_k, self.data)[0]
+        if alg == "insort":
+            out = []
+            insort = bisect.insort
+            for v in self.data:
+                insort(out, v)
+            return out[0]
+        if alg == "array":
+            return array("q", sorted(self.array))[0]
+        if alg in NUMPY_KINDS:
+            return numpy.sort(self.array, kind=NUMPY_KINDS[alg])[0]
+        if alg == "external":
+            runs = external_sort(self.path, self.sorted_path, self.memory_budget)
+            self.counters["merged_runs"] = runs
+            return runs
+        raise ValueError(f"unknown algorithm {alg!r}")
+
+    def sample_metrics(self, reps, elapsed):
+        metrics = dict(self.counters)
+        metrics["elements_per_sec"] = self.n * reps / elapsed if elapsed > 0 else 0
+        return metrics
 
-    def run(self, runs=5, iterations=None):
-        results = [self.run_once() for _ in range(runs)]
-        times = sorted(r["time_s"] for r in results)
-        ops = sorted(r["ops_per_sec"] for r in results)
-        peaks = sorted(r["mem_peak_bytes"] for r in results)
-        mid = len(times) // 2
+    def compare_variants(self, primary, variant_results):
+        def seconds(r):
+            return r["median_time_s"] / r["reps"]
 
+        by_size = {self.n: seconds(primary)}
+        by_distribution = {self.distribution: seconds(primary)}
+        by_algorithm = {self.algorithm: seconds(primary)}
+        for r in variant_results:
+            v = r["variant"]
+            if "algorithm" in v:
+                by_algorithm[v["algorithm"]] = seconds(r)
+            elif "distribution" in v:
+                by_distribution[v["distribution"]] = seconds(r)
+            else:
+                by_size[v["n"]] = seconds(r)
         return {
-            "name": self.name,
-            "runs": runs,
-            "median_time_s": times[mid],
-            "median_ops_per_sec": ops[mid],
-            "median_peak_mem_bytes": peaks[mid],
-            "raw": results
+            "seconds_by_size": dict(sorted(by_size.items())),
+            "seconds_by_distribution": by_distribution,
+            "seconds_by_algorithm": by_algorithm,
         }
 
 if __name__ == "__main__":
-    result = SortingBenchmarkTest(10_000).run()
-    with open("results_python_sorting_benchmark.json", "w") as f:
-        json.dump(result, f, indent=2)
+    main(SortingBenchmarkTest, __file__)
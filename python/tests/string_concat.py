@@ -1,10 +1,56 @@
-import time, json, tracemalloc, gc
+import io
+import math
+import sys
+import time
+from array import array
 
-class StringConcatTest:
+from bench_core import Benchmark, main, traced_peak
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+STRATEGIES = ("plus", "plus_aliased", "join_list", "join_generator", "stringio", "bytearray",
+              "array_u", "fstring_batch")
+# O(n^2) once the in-place resize is defeated: 1e7 appends would copy ~50 TB
+QUADRATIC = {"plus_aliased"}
+# 'u' is deprecated since 3.13 in favour of 'w'
+UNICODE_TYPECODE = "w" if sys.version_info >= (3, 13) else "u"
+
+
+def fit_exponent(points):
+    """Least-squares slope of log(seconds) against log(n): ~1 linear, ~2 quadratic."""
+    if len(points) < 2:
+        return None
+    xs = [math.log(n) for n, _ in points]
+    ys = [math.log(t) for _, t in points]
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    sxx = sum((x - mx) ** 2 for x in xs)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sxx if sxx else None
+
+
+class StringConcatTest(Benchmark):
     name = "StringConcat"
+    default_runs = 3
 
-    def __init__(self, n=50_000):
+    def __init__(self, n=50_000, strategy="both", piece="a", sizes=SIZES, strategies=STRATEGIES,
+                 quadratic_max=100_000):
+        super().__init__()
         self.n = n
+        self.strategy = strategy
+        self.piece = piece
+        self.sizes = sizes
+        self.strategies = strategies
+        self.quadratic_max = quadratic_max
+
+    @property
+    def ops_per_call(self):
+        # n appends for each of the two strategies, or n for a single one
+        return 2 * self.n if self.strategy == "both" else self.n
+
+    def params(self):
+        return {"n": self.n, "strategy": self.strategy, "piece_len": len(self.piece)}
+
+    def variants(self):
+        return [{"strategy": st, "n": n} for st in self.strategies for n in self.sizes
+                if st not in QUADRATIC or n <= self.quadratic_max]
 
     def concat_plus(self):
         s = ""
@@ -15,55 +61,102 @@ class StringConcatTest:
     def concat_join(self):
         return len("".join(["a"] * self.n))
 
-    def run_once(self):
-        gc.collect()
-        tracemalloc.start()
-        t0 = time.perf_counter()
+    def build_plus(self):
+        s, piece = "", self.piece
+        for _ in range(self.n):
+            s += piece
+        return s
 
-        length_plus = self.concat_plus()
-        t1 = time.perf_counter()
+    def build_plus_aliased(self):
+        s, piece = "", self.piece
+        for _ in range(self.n):
+            s += piece
+            alias = s  # a second reference forces a copy on every append
+        del alias
+        return s
 
-        length_join = self.concat_join()
-        t2 = time.perf_counter()
+    def build_join_list(self):
+        piece = self.piece
+        return "".join([piece for _ in range(self.n)])
+
+    def build_join_generator(self):
+        piece = self.piece
+        return "".join(piece for _ in range(self.n))
 
-        current, peak = tracemalloc.get_traced_memory()
-        tracemalloc.stop()
+    def build_stringio(self):
+        buf = io.StringIO()
+        write, piece = buf.write, self.piece
+        for _ in range(self.n):
+            write(piece)
+        return buf.getvalue()
+
+    def build_bytearray(self):
+        buf = bytearray()
+        extend, piece = buf.extend, self.piece.encode()
+        for _ in range(self.n):
+            extend(piece)
+        return buf.decode()
+
+    def build_array_u(self):
+        buf = array(UNICODE_TYPECODE)
+        extend, piece = buf.fromunicode, self.piece
+        for _ in range(self.n):
+            extend(piece)
+        return buf.tounicode()
+
+    def build_fstring_batch(self):
+        p = self.piece
+        batches, rest = divmod(self.n, 8)
+        parts = [f"{p}{p}{p}{p}{p}{p}{p}{p}" for _ in range(batches)]
+        parts.append(p * rest)
+        return "".join(parts)
+
+    def setup(self):
+        if self.strategy != "both":
+            self.build = getattr(self, f"build_{self.strategy}")
+            if len(self.build()) != self.n * len(self.piece):
+                raise ValueError(f"{self.strategy} built the wrong length")
+        # memory is traced in one untimed call; tracing inside the samples would skew them
+        self.peak_mem_bytes = traced_peak(self.workload)
+        self.counters = {}
 
-        plus_time = t1 - t0
-        join_time = t2 - t1
-        total_time = t2 - t0
+    def workload(self):
+        if self.strategy != "both":
+            return self.build()
+        t0 = time.perf_counter()
+        self.concat_plus()
+        t1 = time.perf_counter()
+        self.concat_join()
+        t2 = time.perf_counter()
+
+        self.counters["plus_time_s"] = self.counters.get("plus_time_s", 0.0) + (t1 - t0)
+        self.counters["join_time_s"] = self.counters.get("join_time_s", 0.0) + (t2 - t1)
 
+    def sample_metrics(self, reps, elapsed):
+        if self.strategy != "both":
+            return {"peak_mem_bytes": self.peak_mem_bytes}
+        plus_time = self.counters["plus_time_s"]
+        join_time = self.counters["join_time_s"]
+        n = self.n * reps
         return {
             "plus_time_s": plus_time,
             "join_time_s": join_time,
-            "total_time_s": total_time,
-            "mem_peak_bytes": peak,
-            "length_plus": length_plus,
-            "length_join": length_join,
-            "ops_per_sec_plus": self.n / plus_time if plus_time > 0 else float("inf"),
-            "ops_per_sec_join": self.n / join_time if join_time > 0 else float("inf")
+            "ops_per_sec_plus": n / plus_time if plus_time > 0 else float("inf"),
+            "ops_per_sec_join": n / join_time if join_time > 0 else float("inf"),
+            "peak_mem_bytes": self.peak_mem_bytes,
         }
 
-    def run(self, runs=3, iterations=None):
-        results = [self.run_once() for _ in range(runs)]
-        total_times = sorted(r["total_time_s"] for r in results)
-        plus_times = sorted(r["plus_time_s"] for r in results)
-        join_times = sorted(r["join_time_s"] for r in results)
-        peaks = sorted(r["mem_peak_bytes"] for r in results)
-        mid = len(results) // 2
-
-        return {
-            "name": self.name,
-            "runs": runs,
-            "median_total_time_s": total_times[mid],
-            "median_plus_time_s": plus_times[mid],
-            "median_join_time_s": join_times[mid],
-            "median_peak_mem_bytes": peaks[mid],
-            "raw": results
-        }
+    def compare_variants(self, primary, variant_results):
+        curves = {}
+        for r in variant_results:
+            v = r["variant"]
+            curve = curves.setdefault(v["strategy"], {"ops_per_sec": {}, "peak_mem_bytes": {}, "_points": []})
+            curve["ops_per_sec"][v["n"]] = r["median_ops_per_sec"]
+            curve["peak_mem_bytes"][v["n"]] = r["median_peak_mem_bytes"]
+            curve["_points"].append((v["n"], r["median_time_s"] / r["reps"]))
+        for curve in curves.values():
+            curve["growth_exponent"] = fit_exponent(curve.pop("_points"))
+        return {"scaling": curves}
 
 if __name__ == "__main__":
-    result = StringConcatTest(500_000).run()
-    with open("string_concat_python.json", "w") as f:
-        json.dump(result, f, indent=2)
-    print(json.dumps(result, indent=2))
+    main(StringConcatTest, __file__, n=500_000)
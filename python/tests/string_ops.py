@@ -1,13 +1,99 @@
-import time
-import json
-import gc
+import re
 
-class StringOpsTest:
-    def __init__(self, ops_per_iter=500000):
+from bench_core import Benchmark, main
+from bench_fixtures import fixture
+
+MB = 1024 * 1024
+# whole-corpus operations, grouped by what they compete on
+SUBSTITUTE = ("replace", "translate", "re_sub")
+SEARCH = ("find", "in", "re_search")
+TOKENIZE = ("split", "splitlines", "re_findall")
+# per-line matching as a log parser does it: precompiled vs re's pattern cache vs a cache miss
+REGEX_CACHE = ("re_precompiled", "re_module_cache", "re_recompile")
+OPS = SUBSTITUTE + SEARCH + TOKENIZE + REGEX_CACHE
+KINDS = ("str", "bytes")
+
+ASCII_WORDS = ("request", "served", "cache", "miss", "latency", "upstream", "timeout", "retry",
+               "payload", "session", "token", "stream", "worker", "queue", "shard", "index")
+# Latin-1 and CJK keep the corpus in CPython's 2-byte str storage
+NON_ASCII_WORDS = ("café", "naïve", "Straße", "façade", "données", "データ", "日本語", "서버")
+LEVELS = ("INFO", "WARN", "ERROR", "DEBUG")
+LOG_PATTERN = r"(\d{4}-\d{2}-\d{2}) (\w+) user=(\w+)"
+NEEDLE = "zzqx-not-present"
+SUBSTITUTIONS = {"a": "A", "e": "E", "o": "O"}
+
+
+def make_corpus(rng, size, non_ascii):
+    lines, total = [], 0
+    while total < size:
+        words = [rng.choice(NON_ASCII_WORDS) if rng.random() < non_ascii else rng.choice(ASCII_WORDS)
+                 for _ in range(rng.randrange(4, 12))]
+        line = (f"2025-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d} {rng.choice(LEVELS)} "
+                f"user=u{rng.randrange(100_000)} msg={' '.join(words)}\n")
+        lines.append(line)
+        total += len(line)
+    return "".join(lines)
+
+
+class StringOpsTest(Benchmark):
+    def __init__(self, ops_per_iter=None, op="micro", kind="str", corpus_mb=4, non_ascii=0.1,
+                 regex_lines=10_000, ops=OPS, kinds=KINDS, seed=0):
+        super().__init__(ops_per_iter)
         self.name = "StringOps"
-        self.ops_per_iter = ops_per_iter
+        self.op = op
+        self.kind = kind
+        self.corpus_mb = corpus_mb
+        self.non_ascii = non_ascii
+        self.regex_lines = regex_lines
+        self.ops = ops
+        self.kinds = kinds
+        self.seed = seed
 
-    def workload(self):
+    @property
+    def ops_per_call(self):
+        if self.op == "micro":
+            return 100
+        if self.op in REGEX_CACHE:
+            return len(self.lines)
+        # UTF-8 bytes of corpus processed, for str and bytes alike
+        return self.nbytes
+
+    def params(self):
+        if self.op == "micro":
+            return {"op": "micro"}
+        return {"op": self.op, "kind": self.kind, "corpus_bytes": self.nbytes, "non_ascii": self.non_ascii}
+
+    def variants(self):
+        out = [{"op": op, "kind": k} for op in self.ops for k in self.kinds]
+        # ASCII-only str runs show what the non-ASCII share costs
+        out += [{"op": op, "kind": "str", "non_ascii": 0.0} for op in self.ops]
+        return out
+
+    def setup(self):
+        if self.op == "micro":
+            return
+        text = fixture("text_corpus", make_corpus, int(self.corpus_mb * MB), self.non_ascii,
+                       seed=self.seed, disk=self.corpus_mb >= 16)
+        b = self.kind == "bytes"
+        conv = str.encode if b else str
+        self.text = conv(text)
+        self.nbytes = len(text.encode())
+        self.lines = self.text.splitlines()[:self.regex_lines]
+        self.needle = conv(NEEDLE)
+        self.pairs = [(conv(k), conv(v)) for k, v in SUBSTITUTIONS.items()]
+        if b:
+            self.table = bytes.maketrans(b"".join(k for k, _ in self.pairs), b"".join(v for _, v in self.pairs))
+        else:
+            self.table = str.maketrans(SUBSTITUTIONS)
+        lookup = dict(self.pairs)
+        self.sub_pattern = re.compile(conv("[aeo]"))
+        self.sub_repl = lambda m: lookup[m.group()]
+        self.search_pattern = re.compile(re.escape(self.needle))
+        self.token_pattern = re.compile(conv(r"\S+"))
+        self.log_source = conv(LOG_PATTERN)
+        self.log_pattern = re.compile(self.log_source)
+
+    def micro(self):
         s = "benchmark"
         for _ in range(100):
             s += str(_)
@@ -16,40 +102,64 @@ class StringOpsTest:
             s.find("b")
         return len(s)
 
-    def run_once(self, iterations):
-        gc.collect()
-        start = time.perf_counter()
-        total_len = 0
-        for _ in range(iterations // 100):
-            total_len += self.workload()
-        end = time.perf_counter()
-
-        duration = end - start
-        ops_done = iterations
-        return {
-            "time_s": duration,
-            "ops": ops_done,
-            "ops_per_sec": ops_done / duration if duration > 0 else 0,
-            "gc_stat_after": gc.get_stats() if hasattr(gc, "get_stats") else None,
-            "total_len": total_len
-        }
-
-    def run(self, runs=5, iterations=None):
-        iterations = iterations or self.ops_per_iter
-        results = [self.run_once(iterations) for _ in range(runs)]
-        times = sorted(r["time_s"] for r in results)
-        ops = sorted(r["ops_per_sec"] for r in results)
-
-        return {
-            "name": self.name,
-            "runs": runs,
-            "median_time_sec": times[len(times)//2],
-            "median_ops_per_sec": ops[len(ops)//2],
-            "raw": results
-        }
+    def workload(self):
+        op = self.op
+        if op == "micro":
+            return self.micro()
+        text = self.text
+        if op == "replace":
+            for old, new in self.pairs:
+                text = text.replace(old, new)
+            return len(text)
+        if op == "translate":
+            return len(text.translate(self.table))
+        if op == "re_sub":
+            return len(self.sub_pattern.sub(self.sub_repl, text))
+        if op == "find":
+            return text.find(self.needle)
+        if op == "in":
+            return self.needle in text
+        if op == "re_search":
+            return self.search_pattern.search(text)
+        if op == "split":
+            return len(text.split())
+        if op == "splitlines":
+            return len(text.splitlines())
+        if op == "re_findall":
+            return len(self.token_pattern.findall(text))
+        hits = 0
+        if op == "re_precompiled":
+            match = self.log_pattern.match
+            for line in self.lines:
+                hits += match(line) is not None
+        elif op == "re_module_cache":
+            source, match = self.log_source, re.match
+            for line in self.lines:
+                hits += match(source, line) is not None
+        elif op == "re_recompile":
+            source, match, purge = self.log_source, re.match, re.purge
+            for line in self.lines:
+                purge()
+                hits += match(source, line) is not None
+        else:
+            raise ValueError(f"unknown op {op!r}")
+        return hits
+
+    def sample_metrics(self, reps, elapsed):
+        if self.op == "micro" or self.op in REGEX_CACHE:
+            return {}
+        return {"MBps": self.nbytes * reps / MB / elapsed if elapsed > 0 else 0}
+
+    def compare_variants(self, primary, variant_results):
+        table = {}
+        for r in variant_results:
+            v = r["variant"]
+            column = v["kind"] if "non_ascii" not in v else "str_ascii"
+            value = r.get("median_MBps", r["median_ops_per_sec"])
+            table.setdefault(v["op"], {})[column] = value
+        per_line = {op: table.pop(op) for op in REGEX_CACHE if op in table}
+        # regex cache numbers are lines/sec; everything else MB/s
+        return {"text_MBps": table, "regex_lines_per_sec": per_line}
 
 if __name__ == "__main__":
-    result = StringOpsTest().run()
-    with open("string_ops_python.json", "w") as f:
-        json.dump(result, f, indent=2)
-    print(json.dumps(result, indent=2))
+    main(StringOpsTest, __file__)
@@ -1,69 +1,141 @@
-import time, json, gc
-from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+import sys
+import sysconfig
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-class ThreadingTestTest:
-    name = "Threading / Concurrency"
+from bench_core import Benchmark, default_worker_counts, main
 
-    def __init__(self, threads=8, work_size=2_000_000, runs=3):
-        self.threads = threads
-        self.work_size = work_size
-        self.runs = runs
+EXECUTORS = ("threads", "processes", "shared_memory")
 
-    def cpu_bound_work(self, n):
-        s = 0
-        for i in range(n):
-            s += (i * i) % 97
-        return s
 
-    def thread_task(self):
-        start = time.perf_counter()
-        self.cpu_bound_work(self.work_size // self.threads)
-        end = time.perf_counter()
-        return end - start
+def cpu_bound_work(n):
+    s = 0
+    for i in range(n):
+        s += (i * i) % 97
+    return s
 
-    def run_once(self):
-        gc.collect()
 
-        t0 = time.perf_counter()
+def timed_work(n):
+    start = time.perf_counter()
+    cpu_bound_work(n)
+    return time.perf_counter() - start
 
-        with ThreadPoolExecutor(max_workers=self.threads) as pool:
-            results = list(pool.map(lambda _: self.thread_task(), range(self.threads)))
 
-        t1 = time.perf_counter()
+# shared_memory workers write into these instead of pickling results back
+_shared_sums = None
+_shared_times = None
 
-        total_time = t1 - t0
-        avg_thread_time = sum(results) / self.threads
-        ops_per_s = self.work_size / total_time if total_time > 0 else float("inf")
 
-        return {
-            "total_time_s": total_time,
-            "avg_thread_time_s": avg_thread_time,
-            "ops_per_s": ops_per_s
-        }
+def _attach_shared(sums, times):
+    global _shared_sums, _shared_times
+    _shared_sums, _shared_times = sums, times
+
+
+def _shared_task(args):
+    slot, n = args
+    start = time.perf_counter()
+    _shared_sums[slot] = cpu_bound_work(n)
+    _shared_times[slot] = time.perf_counter() - start
+
+
+def partition(n, parts):
+    base, extra = divmod(n, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def gil_enabled():
+    check = getattr(sys, "_is_gil_enabled", None)
+    return check() if check else True
 
-    def run(self, runs=None, iterations=None):
-        if runs is None:
-            runs = self.runs
 
-        results = [self.run_once() for _ in range(runs)]
-        times = sorted(r["total_time_s"] for r in results)
-        ops   = sorted(r["ops_per_s"] for r in results)
-        avg_t = sorted(r["avg_thread_time_s"] for r in results)
+class ThreadingTestTest(Benchmark):
+    name = "Threading / Concurrency"
+    exclusive = True
+
+    def __init__(self, threads=8, work_size=2_000_000, runs=3,
+                 executor="threads", executors=EXECUTORS, worker_counts=None):
+        super().__init__(runs=runs)
+        self.threads = threads
+        self.work_size = work_size
+        self.executor = executor
+        self.executors = executors
+        self.worker_counts = worker_counts or default_worker_counts()
 
-        mid = len(times) // 2
+    @property
+    def ops_per_call(self):
+        return self.work_size
 
+    def params(self):
         return {
-            "name": self.name,
-            "runs": runs,
             "threads": self.threads,
-            "median_total_time_s": times[mid],
-            "median_avg_thread_time_s": avg_t[mid],
-            "median_ops_per_s": ops[mid],
-            "raw": results
+            "executor": self.executor,
+            "work_size": self.work_size,
+            "free_threaded_build": bool(sysconfig.get_config_var("Py_GIL_DISABLED")),
+            "gil_enabled": gil_enabled(),
         }
 
+    def variants(self):
+        return [{"executor": e, "threads": w} for e in self.executors for w in self.worker_counts]
+
+    def cpu_bound_work(self, n):
+        return cpu_bound_work(n)
+
+    def setup(self):
+        self.chunks = partition(self.work_size, self.threads)
+        if self.executor == "threads":
+            self.pool = ThreadPoolExecutor(max_workers=self.threads)
+        elif self.executor == "processes":
+            self.pool = ProcessPoolExecutor(max_workers=self.threads)
+        elif self.executor == "shared_memory":
+            sums = multiprocessing.Array("q", self.threads, lock=False)
+            times = multiprocessing.Array("d", self.threads, lock=False)
+            self.shared = (sums, times)
+            self.pool = multiprocessing.Pool(self.threads, initializer=_attach_shared, initargs=self.shared)
+        else:
+            raise ValueError(f"unknown executor {self.executor!r}")
+
+    def teardown(self):
+        if self.executor == "shared_memory":
+            self.pool.close()
+            self.pool.join()
+        else:
+            self.pool.shutdown()
+
+    def workload(self):
+        if self.executor == "shared_memory":
+            self.pool.map(_shared_task, list(enumerate(self.chunks)))
+            task_times = list(self.shared[1])
+        else:
+            task_times = list(self.pool.map(timed_work, self.chunks))
+        self.counters["thread_time_s"] = self.counters.get("thread_time_s", 0.0) + sum(task_times)
+        self.counters["calls"] = self.counters.get("calls", 0) + 1
+
+    def sample_metrics(self, reps, elapsed):
+        return {"avg_thread_time_s": self.counters["thread_time_s"] / (self.counters["calls"] * self.threads)}
+
+    def compare_variants(self, primary, variant_results):
+        # speedup and parallel efficiency against the same executor with the fewest workers (normally 1)
+        by_executor = {}
+        for res in variant_results:
+            by_executor.setdefault(res["variant"]["executor"], []).append(res)
+        curves = {}
+        for executor, results in by_executor.items():
+            results.sort(key=lambda r: r["variant"]["threads"])
+            base = results[0]
+            curve = []
+            for r in results:
+                workers = r["variant"]["threads"]
+                speedup = r["median_ops_per_sec"] / base["median_ops_per_sec"]
+                curve.append({
+                    "workers": workers,
+                    "median_time_s": r["median_time_s"],
+                    "median_ops_per_sec": r["median_ops_per_sec"],
+                    "speedup": speedup,
+                    "efficiency": speedup * base["variant"]["threads"] / workers,
+                })
+            curves[executor] = curve
+        return {"scaling": curves}
+
 if __name__ == "__main__":
-    result = ThreadingTestTest().run()
-    with open("results_python_threading.json", "w") as f:
-        json.dump(result, f, indent=2)
-    print(json.dumps(result, indent=2))
+    main(ThreadingTestTest, __file__)
@@ -33,10 +33,13 @@
 /* Config */
 #define DEFAULT_RUNS 5
 #define DEFAULT_OPS 10000000LL
+/* 0: python tests calibrate their own repetition count per sample */
+#define DEFAULT_PY_OPS 0LL
 
 /* forward declarations */
 int list_files_shell(const char *pattern, char names[][MAX_NAME], int max_names);
 int run_and_capture(const char *cmd, const char *output_file);
+int run_python_worker(char names[][MAX_NAME], int count, long runs, long long ops, const char *profile, int variants);
 double extract_ops(const char *filename);
 
 /* ---- Thread-safety primitives ---- */
@@ -190,6 +193,9 @@ int list_files_shell(const char *pattern, char names[][MAX_NAME], int max_names)
         extract_basename_noext(buf, base, sizeof(base));
         if (strcmp(base, "runner") == 0)
             continue;
+        /* bench_* modules are shared harness code, not tests */
+        if (strncmp(base, "bench_", 6) == 0)
+            continue;
         strncpy(names[count], base, MAX_NAME - 1);
         names[count][MAX_NAME - 1] = '\0';
         count++;
@@ -301,6 +307,54 @@ void *worker_thread(void *arg)
 }
 #endif
 
+/* run all python tests through one persistent bench_worker.py process:
+   one job line per test on its stdin, results_python_<test>.json written by the worker;
+   profile (NULL for none) names the profiler mode passed on with every job;
+   variants == 0 runs each test's primary configuration only */
+int run_python_worker(char names[][MAX_NAME], int count, long runs, long long ops, const char *profile, int variants)
+{
+    char cmd[1024];
+#ifdef _WIN32
+    const char *pybin = "python";
+    snprintf(cmd, sizeof(cmd), "%s python\\tests\\bench_worker.py --results-dir python\\tests > python\\tests\\bench_worker.log 2>&1", pybin);
+    FILE *fp = _popen(cmd, "w");
+#else
+    const char *pybin = "python3";
+    snprintf(cmd, sizeof(cmd), "%s python/tests/bench_worker.py --results-dir python/tests > python/tests/bench_worker.log 2>&1", pybin);
+    FILE *fp = popen(cmd, "w");
+#endif
+    if (!fp)
+    {
+        printf(COLOR_RED "Failed to start python benchmark worker\n" COLOR_RESET);
+        return -1;
+    }
+
+    for (int i = 0; i < count; ++i)
+    {
+        printf("[QUEUE python for %s]\n", names[i]);
+        fprintf(fp, "{\"test\": \"%s\", \"runs\": %ld", names[i], runs);
+        if (ops > 0)
+            fprintf(fp, ", \"iterations\": %lld", ops);
+        if (profile)
+            fprintf(fp, ", \"profile\": \"%s\"", profile);
+        if (!variants)
+            fprintf(fp, ", \"variants\": false");
+        fprintf(fp, "}\n");
+    }
+    fflush(stdout);
+
+#ifdef _WIN32
+    int rc = _pclose(fp);
+#else
+    int rc = pclose(fp);
+#endif
+    if (rc == 0)
+        printf("[DONE  python worker] -> python/tests/bench_worker.log\n");
+    else
+        printf("[FAIL  python worker] (code %d) -> python/tests/bench_worker.log\n", rc);
+    return rc;
+}
+
 /* print header and row helpers */
 void print_table_header()
 {
@@ -431,6 +485,51 @@ int main(int argc, char *argv[])
     char names[MAX_TESTS][MAX_NAME];
     int count = list_files_shell(py_pattern, names, MAX_TESTS);
 
+    /* -profile[=cprofile|sampling|both] after -worker/-suite: profile one extra pass per test;
+       -no-variants: primary configurations only, enough for the comparison table */
+    const char *profile = NULL;
+    int variants = 1;
+    for (int i = 2; i < argc; ++i)
+    {
+        if (strcmp(argv[i], "-profile") == 0)
+            profile = "cprofile";
+        else if (strncmp(argv[i], "-profile=", 9) == 0)
+            profile = argv[i] + 9;
+        else if (strcmp(argv[i], "-no-variants") == 0)
+            variants = 0;
+    }
+
+    /* -worker: run the python suite in one long-lived interpreter before comparing */
+    if (argc > 1 && strcmp(argv[1], "-worker") == 0)
+    {
+        if (count <= 0)
+        {
+            printf(COLOR_YELLOW "Warning: no python tests found using pattern %s\n" COLOR_RESET, py_pattern);
+            return 1;
+        }
+        run_python_worker(names, count, DEFAULT_RUNS, DEFAULT_PY_OPS, profile, variants);
+    }
+    /* -suite: python-side scheduler, independent tests in parallel on pinned cores */
+    else if (argc > 1 && strcmp(argv[1], "-suite") == 0)
+    {
+        char cmd[512];
+#ifdef _WIN32
+        snprintf(cmd, sizeof(cmd), "python python\\tests\\bench_suite.py --results-dir python\\tests");
+#else
+        snprintf(cmd, sizeof(cmd), "python3 python/tests/bench_suite.py --results-dir python/tests");
+#endif
+        if (profile)
+        {
+            strncat(cmd, " --profile ", sizeof(cmd) - strlen(cmd) - 1);
+            strncat(cmd, profile, sizeof(cmd) - strlen(cmd) - 1);
+        }
+        if (!variants)
+            strncat(cmd, " --no-variants", sizeof(cmd) - strlen(cmd) - 1);
+        int rc = system(cmd);
+        if (rc != 0)
+            printf(COLOR_YELLOW "Warning: python suite reported failures (code %d)\n" COLOR_RESET, rc);
+    }
+
 //     if (argc > 1 && strcmp(argv[1], "-json") != 0)
 //     {
 